@@ -1,8 +1,16 @@
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import simpledialog
 from argparse import ArgumentParser
 
-from maze import Cell, Maze
+from maze import Cell, Maze, SolutionCache, SolveCancelled, GenerationCancelled
+
+# how often (in ms) the Tk thread checks on a solve or generation running in the background
+POLL_MS = 100
+# the solution animation draws a frame at most this often (in ms), with as many steps in each as the speed calls for
+FRAME_MS = 16
 
 class MazeEditor:
     def __init__(self, master, load_from_file=None):
@@ -10,8 +18,29 @@ class MazeEditor:
         self.highlighted_cell = None
         self.cell_size = 40  # Visual size of cells in pixels
         self.solved = False
+        # retained canvas items: cell_items[(i, j)] is (rectangle, label, {side: wall line}) for every cell, created
+        # once per grid layout and then only changed where the maze changed. drawn_cells[(i, j)] is what those items
+        # show right now as (label text, label colour, walls), and drawn_layout is the (size x, size y, cell size)
+        # they were created for
+        self.cell_items = {}
+        self.drawn_cells = {}
+        self.drawn_layout = None
+        # the solution being animated: the after() id of its next frame, its line item, the canvas points of the
+        # whole path and how many of them are drawn so far
+        self.animation_job = None
+        self.animation_line = None
+        self.animation_points = None
+        self.animation_shown = 0
+        # the solve or generation running on a worker thread, see run_in_background
+        self.job = None
+        self.job_started = None
+        self.job_progress = None
+        self.cancel_event = None
+        self.job_messages = None
         
         self.maze = Maze(15, 12)
+        # pressing Solve again on a maze that hasn't been edited since just looks the answer up
+        self.maze.solution_cache = SolutionCache()
         
         self.create_widgets()
         self.reset_grid()
@@ -26,6 +55,7 @@ class MazeEditor:
 
         self.canvas = tk.Canvas(self.frame)
         self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True, anchor=tk.CENTER)
+        self.canvas.bind("<Button-1>", self.toggle_wall)  # Left-click to toggle a wall
 
         # First row of buttons
         self.button_frame1 = tk.Frame(self.master)
@@ -62,6 +92,9 @@ class MazeEditor:
         self.human_solve_button = tk.Button(self.button_frame2, text="Solve Human Search", command=self.solve_human_search)
         self.human_solve_button.pack(side=tk.LEFT)
 
+        self.astar_solve_button = tk.Button(self.button_frame2, text="Solve A*", command=self.solve_astar)
+        self.astar_solve_button.pack(side=tk.LEFT)
+
         self.remove_solution_button = tk.Button(self.button_frame2, text="Remove Solution", command=self.remove_solution)
         self.remove_solution_button.pack(side=tk.LEFT)
         
@@ -80,17 +113,42 @@ class MazeEditor:
         
         self.load_from_file_button = tk.Button(self.button_frame3, text="Load from File", command=self.load_from_file)
         self.load_from_file_button.pack(side=tk.RIGHT)
+
+        # Status row, for solves and generations running in the background
+        self.status_frame = tk.Frame(self.master)
+        self.status_frame.pack(side=tk.TOP, fill=tk.X, padx=20, pady=(0, 10))
+
+        self.cancel_button = tk.Button(self.status_frame, text="Cancel", command=self.cancel_job, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+
+        # solution animation speed in steps per second, or the whole path at once with Instant
+        self.instant_solution = tk.BooleanVar(value=False)
+        self.instant_checkbox = tk.Checkbutton(self.status_frame, text="Instant", variable=self.instant_solution)
+        self.instant_checkbox.pack(side=tk.RIGHT)
+
+        self.animation_speed = tk.IntVar(value=33)
+        self.speed_scale = tk.Scale(self.status_frame, from_=5, to=500, orient=tk.HORIZONTAL, variable=self.animation_speed,
+                                    label="Steps/s", length=120)
+        self.speed_scale.pack(side=tk.RIGHT)
+
+        self.status_label = tk.Label(self.status_frame, text="", anchor=tk.W)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
         self.canvas.bind("<Button-3>", self.toggle_highlight)  # Right-click to highlight a cell
 
     def reset_grid(self):
+        self.clear_highlight()
         self.maze.cells = {(x, y): Cell(x, y) for x in range(self.maze.grid_size_x) for y in range(self.maze.grid_size_y)}
-        for cell in self.maze.cells.values():
-            cell.highlight_rect = None
+        self.maze.start_cell = None
+        self.maze.end_cell = None
+        self.maze.numbers = []
+        self.maze.forget_solution()
         self.redraw_all()
         
+    # for when the whole maze may have changed (reset, load, generate). the solution on screen no longer applies,
+    # and draw_grid only touches the canvas items of cells that look different
     def redraw_all(self):
-        self.canvas.delete("all")
+        self.remove_solution()
         self.draw_grid()
 
     def prompt_grid_size(self):
@@ -113,9 +171,6 @@ class MazeEditor:
             self.reset_grid()
             self.maze.load_from_file(filename)
             self.resize_master()
-
-            for cell in self.maze.cells.values():
-                cell.highlight_rect = None
             self.draw_grid()
 
     def resize_grid(self,):
@@ -132,99 +187,117 @@ class MazeEditor:
             width = 550
         else:
             width = canvas_width+40
-        self.master.geometry(f"{width}x{canvas_height+145}")
+        self.master.geometry(f"{width}x{canvas_height+220}")
 
+    # brings every cell's canvas items up to date. the items are only created again when the grid or cell size changed
     def draw_grid(self):
+        layout = (self.maze.grid_size_x, self.maze.grid_size_y, self.cell_size)
+        if layout != self.drawn_layout:
+            self.build_canvas(layout)
         for i in range(self.maze.grid_size_x):
             for j in range(self.maze.grid_size_y):
-                x1, y1 = i * self.cell_size, j * self.cell_size
-                self.draw_cell(i, j, x1, y1)
-                cell = self.maze.cells[(i, j)]
-                if not hasattr(cell, 'highlight_rect'):
-                    cell.highlight_rect = None
-                if cell.highlight_rect:
-                    self.canvas.tag_raise(cell.highlight_rect)
+                self.draw_cell(i, j)
+
+    # throws away every canvas item and creates the items for each cell of the new layout, all blank and with the
+    # walls hidden, so draw_cell only has to fill in the cells that aren't
+    def build_canvas(self, layout):
+        self.cancel_animation()
+        self.canvas.delete("all")
+        self.solved = False
+        self.cell_items = {}
+        self.drawn_cells = {}
+        self.drawn_layout = layout
+        size_x, size_y, cell_size = layout
+        for i in range(size_x):
+            for j in range(size_y):
+                x1, y1 = i * cell_size, j * cell_size
+                x2, y2 = x1 + cell_size, y1 + cell_size
+                rectangle = self.canvas.create_rectangle(x1, y1, x2, y2, outline="light grey", tags=("cell", f"{i},{j}"))
+                label = self.canvas.create_text(x1 + cell_size / 2, y1 + cell_size / 2, text="", font=('Arial', cell_size//2))
+                walls = {
+                    'top': self.canvas.create_line(x1, y1, x2, y1, fill="black", state=tk.HIDDEN),
+                    'right': self.canvas.create_line(x2, y1, x2, y2, fill="black", state=tk.HIDDEN),
+                    'bottom': self.canvas.create_line(x1, y2, x2, y2, fill="black", state=tk.HIDDEN),
+                    'left': self.canvas.create_line(x1, y1, x1, y2, fill="black", state=tk.HIDDEN),
+                }
+                self.cell_items[(i, j)] = (rectangle, label, walls)
+                self.drawn_cells[(i, j)] = ("", "black", (False, False, False, False))
+        # the highlight went with the old items
+        if self.highlighted_cell:
+            self.highlighted_cell.highlight_rect = None
+            self.draw_highlight()
 
     def prompt_cell_size(self):
         size = simpledialog.askinteger("Input", "Enter cell size (default is 40, min is 20, max is 60):", parent=self.master, minvalue=20, maxvalue=60)
         if size:
             self.cell_size = size        
-            for cell in self.maze.cells.values():
-                cell.highlight_rect = None
-            self.canvas.delete("all")
             self.resize_master()
             self.draw_grid()
 
-    def draw_cell(self, i, j, x1, y1):
-        x2, y2 = x1 + self.cell_size, y1 + self.cell_size
-        cell_id = self.canvas.create_rectangle(x1, y1, x2, y2, outline="light grey", tags=("cell", f"{i},{j}"))
-        self.maze.cells[(i, j)].id = cell_id
+    # updates the canvas items of cell (i, j) to match the maze, changing only what differs from what they show now
+    def draw_cell(self, i, j):
         cell = self.maze.cells[(i, j)]
         if cell.is_start:
-            self.canvas.create_text(x1 + self.cell_size / 2, y1 + self.cell_size / 2, text="S", fill="green", font=('Arial', self.cell_size//2), tags=(f"{cell.coords()}-start"))
+            text, colour = "S", "green"
         elif cell.is_end:
-            self.canvas.create_text(x1 + self.cell_size / 2, y1 + self.cell_size / 2, text="E", fill="red", font=('Arial', self.cell_size//2), tags=(f"{cell.coords()}-end"))
+            text, colour = "E", "red"
         elif cell.number is not None:
-            self.canvas.create_text(x1 + self.cell_size / 2, y1 + self.cell_size / 2, text=str(cell.number), font=('Arial', self.cell_size//2), tags=(f"{cell.coords()}-number"))
-        self.update_cell_walls(i, j)
-
-    def update_cell_walls(self, i, j):
-        cell = self.maze.cells[(i, j)]
-        x1, y1 = i * self.cell_size, j * self.cell_size
-        x2, y2 = x1 + self.cell_size, y1 + self.cell_size
-
-        self.canvas.delete(f"wall-{i},{j}-top")
-        self.canvas.delete(f"wall-{i},{j}-right")
-        self.canvas.delete(f"wall-{i},{j}-bottom")
-        self.canvas.delete(f"wall-{i},{j}-left")
-
-        if cell.walls['top']:
-            self.canvas.create_line(x1, y1, x2, y1, fill="black", tags=(f"wall-{i},{j}-top"))
-        if cell.walls['right']:
-            self.canvas.create_line(x2, y1, x2, y2, fill="black", tags=(f"wall-{i},{j}-right"))
-        if cell.walls['bottom']:
-            self.canvas.create_line(x1, y2, x2, y2, fill="black", tags=(f"wall-{i},{j}-bottom"))
-        if cell.walls['left']:
-            self.canvas.create_line(x1, y1, x1, y2, fill="black", tags=(f"wall-{i},{j}-left"))
+            text, colour = str(cell.number), "black"
+        else:
+            text, colour = "", "black"
+        walls = (cell.walls['top'], cell.walls['right'], cell.walls['bottom'], cell.walls['left'])
 
-        self.canvas.bind("<Button-1>", self.toggle_wall)
+        drawn = self.drawn_cells[(i, j)]
+        if drawn == (text, colour, walls):
+            return
+        _, label, wall_lines = self.cell_items[(i, j)]
+        if drawn[:2] != (text, colour):
+            self.canvas.itemconfig(label, text=text, fill=colour)
+        for k, side in enumerate(('top', 'right', 'bottom', 'left')):
+            if drawn[2][k] != walls[k]:
+                self.canvas.itemconfig(wall_lines[side], state=tk.NORMAL if walls[k] else tk.HIDDEN)
+        self.drawn_cells[(i, j)] = (text, colour, walls)
 
     def toggle_wall(self, event):
+        # the maze is being solved or replaced on the worker thread
+        if self.job is not None:
+            return
         i, j = (event.x // self.cell_size, event.y // self.cell_size)
-        cell = self.maze.cells[(i, j)]
 
         alsoUpdate = {'i':i, 'j':j}
 
         # Determine which wall to toggle based on the click position within the cell
         x, y = event.x % self.cell_size, event.y % self.cell_size
+        side = None
         if x < self.cell_size / 4 and i > 0:
-            cell.walls['left'] = not cell.walls['left']
-            if i > 0:
-                otherCell = self.maze.cells[(i-1, j)]
-                otherCell.walls['right'] = not otherCell.walls['right']
-                alsoUpdate['i'] = i-1
+            side = 'left'
+            alsoUpdate['i'] = i-1
         elif x > 3 * self.cell_size / 4 and i < self.maze.grid_size_x - 1:
-            cell.walls['right'] = not cell.walls['right']
-            if i < self.maze.grid_size_x - 1:
-                otherCell = self.maze.cells[(i+1, j)]
-                otherCell.walls['left'] = not otherCell.walls['left']
-                alsoUpdate['i'] = i+1
+            side = 'right'
+            alsoUpdate['i'] = i+1
         elif y < self.cell_size / 4 and j > 0:
-            cell.walls['top'] = not cell.walls['top']
-            if j > 0:
-                otherCell = self.maze.cells[(i, j-1)]
-                otherCell.walls['bottom'] = not otherCell.walls['bottom']
-                alsoUpdate['j'] = j-1
+            side = 'top'
+            alsoUpdate['j'] = j-1
         elif y > 3 * self.cell_size / 4 and j < self.maze.grid_size_y - 1:
-            cell.walls['bottom'] = not cell.walls['bottom']
-            if j < self.maze.grid_size_y - 1:
-                otherCell = self.maze.cells[(i, j+1)]
-                otherCell.walls['top'] = not otherCell.walls['top']
-                alsoUpdate['j'] = j+1
+            side = 'bottom'
+            alsoUpdate['j'] = j+1
+        if side is None:
+            return
+
+        # the maze follows the edit itself, so the solution on screen only changes if the wall was in its way or opens a shortcut
+        result = self.maze.toggle_wall(i, j, side)
 
-        self.update_cell_walls(i, j)
+        self.draw_cell(i, j)
         if alsoUpdate['i'] != i or alsoUpdate['j'] != j:
-            self.update_cell_walls(alsoUpdate['i'], alsoUpdate['j'])
+            self.draw_cell(alsoUpdate['i'], alsoUpdate['j'])
+
+        if self.solved and result in ('improved', 'repaired'):
+            self.remove_solution()
+            self.draw_solution(self.maze.solution.path_coords(), animate=False)
+            self.solved = True
+        elif self.solved and result == 'stale':
+            # the edit broke the solution and it can't be patched up locally, take it off screen until Solve is pressed again
+            self.remove_solution()
             
     def toggle_highlight(self, event):
         # i and j are coords for cell that was clicked
@@ -232,63 +305,73 @@ class MazeEditor:
         
         # if we clicked the already highlighted cell
         if self.highlighted_cell and self.highlighted_cell == self.maze.cells[(i, j)]:
-            self.canvas.delete(self.highlighted_cell.highlight_rect)
-            self.highlighted_cell.highlight_rect = None
-            self.highlighted_cell = None
+            self.clear_highlight()
         else:
-            if self.highlighted_cell:
-                self.canvas.delete(self.highlighted_cell.highlight_rect)
-                self.highlighted_cell.highlight_rect = None
-
+            self.clear_highlight()
             self.highlighted_cell = self.maze.cells[(i, j)]
+            self.draw_highlight()
 
-            x1, y1 = i * self.cell_size, j * self.cell_size
-            x2, y2 = x1 + self.cell_size, y1 + self.cell_size
-            self.highlighted_cell.highlight_rect = self.canvas.create_rectangle(x1, y1, x2, y2, outline="blue", width=2)
+    def draw_highlight(self):
+        i, j = self.highlighted_cell.coords()
+        x1, y1 = i * self.cell_size, j * self.cell_size
+        x2, y2 = x1 + self.cell_size, y1 + self.cell_size
+        self.highlighted_cell.highlight_rect = self.canvas.create_rectangle(x1, y1, x2, y2, outline="blue", width=2)
 
+    def clear_highlight(self):
+        if self.highlighted_cell:
+            if getattr(self.highlighted_cell, 'highlight_rect', None):
+                self.canvas.delete(self.highlighted_cell.highlight_rect)
+            self.highlighted_cell.highlight_rect = None
+            self.highlighted_cell = None
+
+    # start, end and number edits change what the maze's solution is, so the one on screen is taken off
     def set_start_cell(self):
         if self.highlighted_cell:
+            previous = self.maze.start_cell
             if self.highlighted_cell.is_start:
-                self.canvas.delete(f"{self.highlighted_cell.coords()}-start")
                 self.highlighted_cell.is_start = False
                 self.maze.start_cell = None
-                self.redraw_all()
             else:
-                for cell in self.maze.cells.values():
-                    self.canvas.delete(f"{cell.coords()}-start")
-                    cell.is_start = False
+                if previous is not None:
+                    previous.is_start = False
                 self.highlighted_cell.is_start = True
                 self.maze.start_cell = self.highlighted_cell
-            self.draw_grid()
+            self.maze.forget_solution()
+            self.remove_solution()
+            if previous is not None:
+                self.draw_cell(*previous.coords())
+            self.draw_cell(*self.highlighted_cell.coords())
 
     def set_end_cell(self):
         if self.highlighted_cell:
+            previous = self.maze.end_cell
             if self.highlighted_cell.is_end:
-                self.canvas.delete(f"{self.highlighted_cell.coords()}-end")
                 self.highlighted_cell.is_end = False
                 self.maze.end_cell = None
-                self.redraw_all()
             else:
-                for cell in self.maze.cells.values():
-                    self.canvas.delete(f"{cell.coords()}-end")
-                    cell.is_end = False
+                if previous is not None:
+                    previous.is_end = False
                 self.highlighted_cell.is_end = True
                 self.maze.end_cell = self.highlighted_cell
-            self.draw_grid()
+            self.maze.forget_solution()
+            self.remove_solution()
+            if previous is not None:
+                self.draw_cell(*previous.coords())
+            self.draw_cell(*self.highlighted_cell.coords())
 
     def place_number(self):
         if self.highlighted_cell:
             if self.highlighted_cell.number is not None:
-                self.canvas.delete(f"{self.highlighted_cell.coords()}-number")
                 self.maze.remove_number(self.highlighted_cell.number)
                 self.highlighted_cell.number = None
-                self.redraw_all()
+                self.remove_solution()
             else:
                 number = simpledialog.askinteger("Input", "Enter cell number:", parent=self.master, minvalue=1, maxvalue=100)
                 if number is not None:
                     self.highlighted_cell.number = number
                     self.maze.add_number(number)
-            self.draw_grid()
+                    self.remove_solution()
+            self.draw_cell(*self.highlighted_cell.coords())
         
     def find_cell_coordinates(self, cell):
         for i in range(self.maze.grid_size_x):
@@ -298,63 +381,176 @@ class MazeEditor:
         return None, None 
     
     def solve_dfs(self):
-        if self.solved:
-            self.remove_solution()
-        solution = self.maze.solve_dfs(one_solution=True)[0]
-        
-        if solution:
-            self.draw_solution(solution.path_coords())
-            self.solved = True
-        else:
-            print("No solution found")
+        self.start_solve("DFS", self.maze.solve_dfs, one_solution=True)
     
     def solve_bfs(self):
-        if self.solved:
-            self.remove_solution()
-        solution = self.maze.solve_bfs(one_solution=True)[0]
-        
-        if solution:
-            self.draw_solution(solution.path_coords())
-            self.solved = True 
-        else:
-            print("No solution found")
+        self.start_solve("BFS", self.maze.solve_bfs, one_solution=True)
 
     def solve_human_search(self):
-        if self.solved:
-            self.remove_solution()
-        solution = self.maze.solve_human_search(one_solution=True)[0]
-        if solution:
-            self.draw_solution(solution.path_coords())
-            self.solved = True
-        else:
-            print("No solution found")
+        self.start_solve("Human search", self.maze.solve_human_search, one_solution=True)
+
+    def solve_astar(self):
+        self.start_solve("A*", self.maze.solve_astar)
+
+    # solve(**options) runs in the background and the first solution it finds is drawn once it's done
+    def start_solve(self, name, solve, **options):
+        # also stops a solution that's still being animated
+        self.remove_solution()
+
+        def done(solutions, error):
+            if isinstance(error, SolveCancelled):
+                self.status_label.config(text=f"{name} cancelled after {error.stats.iterations} iterations")
+            elif error is not None:
+                self.status_label.config(text=f"{name} failed: {error!r}")
+            elif solutions:
+                self.status_label.config(text=f"{name}: {self.describe_progress(solutions.stats)} in {solutions.stats.wall_time:.2f}s")
+                self.draw_solution(solutions[0].path_coords())
+                self.solved = True
+            else:
+                self.status_label.config(text=f"{name}: no solution found")
+                print("No solution found")
+
+        self.run_in_background(name, lambda cancel, progress: solve(cancel=cancel, progress=progress, **options), done)
+
+    # runs work(cancel, progress) on a worker thread so the window keeps responding however long it takes. the
+    # worker never touches Tk, it only puts progress and its result on self.job_messages, and poll_job picks them up
+    # on the Tk thread with after() and calls done(result, error). the buttons and wall edits are switched off
+    # until then, so nothing changes the maze under the worker
+    def run_in_background(self, name, work, done):
+        self.job = name
+        self.job_started = time.perf_counter()
+        self.job_progress = None
+        self.cancel_event = threading.Event()
+        self.job_messages = messages = queue.Queue()
+        self.set_busy(True)
+
+        def run():
+            try:
+                result = work(self.cancel_event, lambda progress: messages.put(('progress', progress)))
+            except Exception as error:
+                messages.put(('done', None, error, done))
+            else:
+                messages.put(('done', result, None, done))
+
+        threading.Thread(target=run, daemon=True).start()
+        self.master.after(POLL_MS, self.poll_job)
+
+    def poll_job(self):
+        finished = None
+        while True:
+            try:
+                message = self.job_messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'progress':
+                self.job_progress = message[1]
+            else:
+                finished = message
+        if finished is None:
+            # the time comes from here rather than the progress, so it keeps ticking between progress reports
+            if not self.cancel_event.is_set():
+                text = f"{self.job}: {time.perf_counter() - self.job_started:.1f}s"
+                if self.job_progress is not None:
+                    text += f", {self.describe_progress(self.job_progress)}"
+                self.status_label.config(text=text)
+            self.master.after(POLL_MS, self.poll_job)
+            return
+        _, result, error, done = finished
+        self.job = None
+        self.set_busy(False)
+        done(result, error)
+
+    # progress is the SolverStats of a solve or the GenerationProgress of a generation
+    def describe_progress(self, progress):
+        if hasattr(progress, 'attempts'):
+            return f"{progress.attempts} attempts"
+        return f"{progress.iterations} iterations"
+
+    def cancel_job(self):
+        if self.job is not None:
+            self.cancel_event.set()
+            self.status_label.config(text=f"{self.job}: cancelling")
+
+    def set_busy(self, busy):
+        for frame in (self.button_frame1, self.button_frame2, self.button_frame3):
+            for button in frame.winfo_children():
+                button.config(state=tk.DISABLED if busy else tk.NORMAL)
+        self.cancel_button.config(state=tk.NORMAL if busy else tk.DISABLED)
 
     def remove_solution(self):
+        self.cancel_animation()
         self.canvas.delete("solution_path")
         self.solved = False
 
-    def draw_solution(self, path):
+    # draws path as one line that grows a step at a time from after() callbacks, so the window keeps responding while
+    # it's drawn. with animate=False or Instant ticked the whole line is drawn straight away
+    def draw_solution(self, path, animate=True):
+        self.cancel_animation()
         # Check if the path is empty
-        if not path:
+        if len(path) < 2:
             return
 
         # Convert grid cell coordinates to canvas coordinates (centers of cells)
         canvas_path = [(x * self.cell_size + self.cell_size / 2, y * self.cell_size + self.cell_size / 2) for x, y in path]
-        
-        # Draw the solution path slowly
-        for i in range(len(canvas_path) - 1):
-            self.canvas.create_line(canvas_path[i], canvas_path[i + 1], fill="blue", width=2, tags="solution_path")
-            self.canvas.update()
-            self.canvas.after(30)
-            
+
+        if not animate or self.instant_solution.get():
+            self.canvas.create_line(*canvas_path, fill="blue", width=2, tags="solution_path")
+            return
+
+        self.animation_points = canvas_path
+        self.animation_shown = 2
+        self.animation_line = self.canvas.create_line(*canvas_path[:2], fill="blue", width=2, tags="solution_path")
+        self.animation_job = self.canvas.after(self.animation_delay()[0], self.animate_solution)
+
+    # (ms until the next frame, steps to draw in it) for the speed on the slider
+    def animation_delay(self):
+        speed = max(1, self.animation_speed.get())
+        if speed * FRAME_MS < 1000:
+            return 1000 // speed, 1
+        return FRAME_MS, speed * FRAME_MS // 1000
+
+    def animate_solution(self):
+        delay, steps = self.animation_delay()
+        if self.instant_solution.get():
+            steps = len(self.animation_points)
+        self.animation_shown = min(len(self.animation_points), self.animation_shown + steps)
+        self.canvas.coords(self.animation_line, *[value for point in self.animation_points[:self.animation_shown] for value in point])
+        if self.animation_shown < len(self.animation_points):
+            self.animation_job = self.canvas.after(delay, self.animate_solution)
+        else:
+            self.animation_job = None
+
+    # stops the animation where it is, the part already drawn stays until remove_solution
+    def cancel_animation(self):
+        if self.animation_job is not None:
+            self.canvas.after_cancel(self.animation_job)
+            self.animation_job = None
+
     def new_maze_random_walls(self):
+        self.clear_highlight()
         self.maze.new_maze_random_walls()
         self.redraw_all()
         
     def new_maze_random_path(self):
         fun_score = simpledialog.askinteger("Input", "Enter fun score from 1 to 4 (note - higher fun scores will take longer to generate):", parent=self.master, minvalue=1, maxvalue=4)
-        self.maze.new_maze_random_path(fun_score)
-        self.redraw_all()
+        if fun_score is None:
+            return
+        # generated into a maze of its own, so a cancelled run leaves the one on screen as it was
+        maze = Maze(self.maze.grid_size_x, self.maze.grid_size_y)
+        maze.solution_cache = self.maze.solution_cache
+
+        def done(progress, error):
+            if isinstance(error, GenerationCancelled):
+                self.status_label.config(text=f"Generation cancelled after {error.progress.attempts} attempts")
+            elif error is not None:
+                self.status_label.config(text=f"Generation failed: {error!r}")
+            else:
+                self.status_label.config(text=f"Generated in {self.describe_progress(progress)}, {progress.elapsed:.1f}s")
+                self.clear_highlight()
+                self.maze = maze
+                self.redraw_all()
+
+        self.run_in_background("Generating", lambda cancel, progress: maze.new_maze_random_path(fun_score, cancel=cancel, progress=progress), done)
 
 parser = ArgumentParser(
                 prog='guiMazeCreator.py',
@@ -1,9 +1,18 @@
-from enum import Enum
 import time
-from typing import Literal, List, Dict, Tuple
-from collections import deque
+from typing import List, Dict, Tuple
+from collections import deque, OrderedDict
+from collections.abc import Mapping
+import functools
+import hashlib
+import inspect
+import json
 import os
-import random, copy
+import random
+import heapq
+from bisect import insort
+import struct
+import sys
+from array import array
 
 class Cell:
     def __init__(self, x, y):
@@ -66,6 +75,162 @@ class Cell:
         return (self.x, self.y)
 
 
+# bit layout of one cell in a compact grid, same as one cell byte in a maze file
+WALL_BITS = {'top': 0b10000000, 'right': 0b01000000, 'bottom': 0b00100000, 'left': 0b00010000}
+NUMBER_MASK = 0b00001111
+
+# side -> (step in x, step in y, the side the same wall is on in the cell across it)
+WALL_SIDES = {'top': (0, -1, 'bottom'), 'right': (1, 0, 'left'), 'bottom': (0, 1, 'top'), 'left': (-1, 0, 'right')}
+
+
+# maze files. version 1 has no header: grid size x, grid size y, start x, start y, end x, end y as one byte each,
+# then one byte per cell going along the rows, with the walls in the top four bits (see WALL_BITS) and the number
+# in the bottom four. version 2 starts with MAZE_MAGIC, the version and a flags byte, then the same six values as
+# 16 bit numbers, then the walls packed two cells to a byte (same four bits as version 1, first cell in the top
+# half) and then one number per cell, 8 bit or 16 bit if the flags have NUMBERS_16_BIT. all big-endian
+MAZE_MAGIC = b'NMZ'
+FORMAT_VERSION = 2
+NUMBERS_16_BIT = 0b00000001
+V2_HEADER = struct.Struct('>3sBBHHHHHH')
+# bytes.translate tables: top four bits moved down, bottom four bits, and bottom four bits moved up
+HIGH_NIBBLE = bytes(byte >> 4 for byte in range(256))
+LOW_NIBBLE = bytes(byte & 0x0F for byte in range(256))
+NIBBLE_TO_HIGH = bytes((byte << 4) & 0xFF for byte in range(256))
+# (top, right, bottom, left) for each value of the four wall bits
+WALL_PATTERNS = [(bool(bits & 8), bool(bits & 4), bool(bits & 2), bool(bits & 1)) for bits in range(16)]
+
+
+# ors two equal length byte strings together in one go
+def or_bytes(a, b) -> bytes:
+    return (int.from_bytes(a, 'big') | int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+
+class CompactWalls:
+    # dict-like view over the four wall bits of one cell in a compact grid
+    __slots__ = ('grid', 'index')
+
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
+
+
+    def __getitem__(self, side):
+        return bool(self.grid[self.index] & WALL_BITS[side])
+
+
+    def __setitem__(self, side, value):
+        if value:
+            self.grid[self.index] |= WALL_BITS[side]
+        else:
+            self.grid[self.index] &= ~WALL_BITS[side] & 0xFF
+
+
+    def __iter__(self):
+        return iter(WALL_BITS)
+
+
+    def keys(self):
+        return WALL_BITS.keys()
+
+
+    def items(self):
+        return [(side, self[side]) for side in WALL_BITS]
+
+
+class CompactCell(Cell):
+    # thin view over one byte of Maze.grid, created on demand so a compact maze doesn't hold a Cell per square
+    def __init__(self, maze, x, y):
+        self.maze = maze
+        self.x = x
+        self.y = y
+        self.index = y * maze.grid_size_x + x
+
+
+    def __eq__(self, other):
+        return isinstance(other, CompactCell) and other.maze is self.maze and other.index == self.index
+
+
+    def __hash__(self):
+        return self.index
+
+
+    def __deepcopy__(self, memo):
+        # views don't own any state, so a copy of a path can share them
+        return self
+
+
+    @property
+    def walls(self):
+        return CompactWalls(self.maze.grid, self.index)
+
+
+    @property
+    def number(self):
+        number = self.maze.grid[self.index] & NUMBER_MASK
+        return number if number != 0 else None
+
+
+    @number.setter
+    def number(self, number):
+        if number is None:
+            number = 0
+        elif not 0 < number <= NUMBER_MASK:
+            raise ValueError(f'compact mazes can only hold numbers from 1 to {NUMBER_MASK}')
+        self.maze.grid[self.index] = (self.maze.grid[self.index] & ~NUMBER_MASK & 0xFF) | number
+
+
+    @property
+    def is_start(self):
+        return self.maze.start_cell is not None and self.maze.start_cell == self
+
+
+    @is_start.setter
+    def is_start(self, value):
+        if value:
+            self.maze.start_cell = self
+        elif self.is_start:
+            self.maze.start_cell = None
+
+
+    @property
+    def is_end(self):
+        return self.maze.end_cell is not None and self.maze.end_cell == self
+
+
+    @is_end.setter
+    def is_end(self, value):
+        if value:
+            self.maze.end_cell = self
+        elif self.is_end:
+            self.maze.end_cell = None
+
+
+class CompactCells(Mapping):
+    # read-only (x, y) -> CompactCell mapping that stands in for the Maze.cells dict
+    def __init__(self, maze):
+        self.maze = maze
+
+
+    def __getitem__(self, key):
+        x, y = key
+        if not (0 <= x < self.maze.grid_size_x and 0 <= y < self.maze.grid_size_y):
+            raise KeyError(key)
+        return CompactCell(self.maze, x, y)
+
+
+    def __contains__(self, key):
+        x, y = key
+        return 0 <= x < self.maze.grid_size_x and 0 <= y < self.maze.grid_size_y
+
+
+    def __iter__(self):
+        return ((x, y) for x in range(self.maze.grid_size_x) for y in range(self.maze.grid_size_y))
+
+
+    def __len__(self):
+        return self.maze.grid_size_x * self.maze.grid_size_y
+
+
 class Path:
     path: list[Cell]
     last_seen_number: int
@@ -87,6 +252,735 @@ class Path:
         return [cell.coords() for cell in self.path]
 
 
+class PathIndex:
+    # where each cell of a path is, by grid index (y*width + x): positions[i] is the cell's place in the path or -1
+    # and on_path[i] is 1 if the cell is in it, so membership and "next to each other in the path" are O(1)
+    # instead of path.index and in scans over the list
+    def __init__(self, maze, path):
+        self.width = maze.grid_size_x
+        size = maze.grid_size_x * maze.grid_size_y
+        self.positions = array('i', [-1]) * size
+        self.on_path = bytearray(size)
+        for position, cell in enumerate(path):
+            i = cell.y * self.width + cell.x
+            if not self.on_path[i]:
+                self.positions[i] = position
+                self.on_path[i] = 1
+
+
+    def __contains__(self, cell):
+        return self.on_path[cell.y * self.width + cell.x] == 1
+
+
+    def position(self, cell):
+        return self.positions[cell.y * self.width + cell.x]
+
+
+    def consecutive(self, cell1, cell2):
+        position1 = self.positions[cell1.y * self.width + cell1.x]
+        position2 = self.positions[cell2.y * self.width + cell2.x]
+        return position1 >= 0 and position2 >= 0 and abs(position1 - position2) == 1
+
+
+class SolverStats:
+    # what a solver did to get its result. iterations is the solver's own loop count (cells visited for dfs and
+    # human search, paths looked at for bfs, routes tried for segments), nodes_expanded is how many cells had their
+    # neighbors looked at and peak_frontier is the most entries the stack / queue / heap held at once
+    def __init__(self, method):
+        self.method = method
+        self.iterations = 0
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+        self.wall_time = 0.0
+        self.solutions_found = 0
+        self.cached = False
+
+
+    def __str__(self):
+        return ', '.join(f'{key}: {value}' for key, value in self.as_dict().items())
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+    def write(self, filename):
+        with open(filename, 'w') as f:
+            for key, value in self.as_dict().items():
+                f.write(f'{key}: {value}\n')
+
+
+class SolveCancelled(Exception):
+    # raised when a solver's cancel event is set. stats is the SolverStats of the solve up to that point
+    def __init__(self, message, stats):
+        super().__init__(message)
+        self.stats = stats
+
+
+# how many iterations the solvers go between calls to their check_stop, which reports progress and looks for a cancel
+STOP_CHECK_INTERVAL = 1024
+
+
+class Solutions(list):
+    # the list of Paths a solver returns, plus the SolverStats of the solve that found them
+    def __init__(self, paths=(), stats=None):
+        super().__init__(paths)
+        self.stats = stats
+
+
+# solver options that only change where the stats go or whether the solve finishes, not what gets found, so they're left out of the cache key
+UNCACHED_OPTIONS = ('observer', 'stats_file', 'cancel', 'progress')
+
+
+class SolutionCache:
+    # solver results keyed by solution_key, so asking for the same maze again costs a hash instead of a search.
+    # the newest max_entries results are kept in memory, oldest used thrown out first. with a directory every result
+    # is also saved there as <key>.json, and once the files add up to more than max_disk_bytes the least recently
+    # used ones are deleted. the key is a hash of the maze file itself, so changing any wall, number, the start or the
+    # end gives a different key and an old result can never be handed back for an edited maze
+    def __init__(self, max_entries=128, directory=None, max_disk_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_bytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self.disk_files())
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def clear(self):
+        self.entries.clear()
+
+
+    def solution_key(self, maze, method, options) -> str:
+        key = hashlib.sha256(maze.to_bytes(FORMAT_VERSION))
+        key.update(repr((method, sorted(options.items()), maze.numbers)).encode('utf-8'))
+        return key.hexdigest()
+
+
+    # the entry saved for key, or None. an entry is {'paths': [[(x, y), ...], ...], 'last_seen_numbers': [...],
+    # 'stats': SolverStats.as_dict()}
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.directory is not None:
+            entry = self.read_disk(key)
+            if entry is not None:
+                self.remember(key, entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+
+    def put(self, key, solutions):
+        entry = {'paths': [solution.path_coords() for solution in solutions],
+                 'last_seen_numbers': [solution.last_seen_number for solution in solutions],
+                 'stats': solutions.stats.as_dict()}
+        self.remember(key, entry)
+        if self.directory is not None:
+            self.write_disk(key, entry)
+
+
+    def remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+    def disk_path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+
+    # (path, size, last used) for every entry in the directory
+    def disk_files(self):
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    info = entry.stat()
+                    files.append((entry.path, info.st_size, info.st_mtime))
+        return files
+
+
+    def read_disk(self, key):
+        path = self.disk_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            # bump it so eviction sees it as just used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # half written or damaged, treat it as missing
+            self.remove_disk(path)
+            return None
+        entry['paths'] = [[tuple(coords) for coords in path] for path in entry['paths']]
+        return entry
+
+
+    # written to a temporary file first and moved into place, so other processes sharing the directory never see
+    # half an entry
+    def write_disk(self, key, entry):
+        data = json.dumps(entry).encode('utf-8')
+        path = self.disk_path(key)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(data)
+        # writing a key that's already there replaces its file, so only the difference in size is new
+        try:
+            replaced_bytes = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced_bytes = 0
+        os.replace(temporary_path, path)
+        self.disk_bytes += len(data) - replaced_bytes
+        if self.disk_bytes > self.max_disk_bytes:
+            self.evict_disk()
+
+
+    # deletes the least recently used files until the directory is back under max_disk_bytes. the total is counted
+    # again from the files, since other processes may have been adding to the same directory
+    def evict_disk(self):
+        files = sorted(self.disk_files(), key=lambda file: file[2])
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            if self.remove_disk(path):
+                self.disk_bytes -= size
+
+
+    def remove_disk(self, path) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+# wraps a Maze.solve_* method so it goes through the maze's solution_cache when it has one. the arguments are
+# matched up against the method's own signature, so solve_dfs(True) and solve_dfs(one_solution=True) share an entry.
+# a cached result comes back as fresh Paths over the maze's own cells, with the stats of the solve that found it and
+# stats.cached set. the observer and stats_file still get called / written on a hit
+def cached_solve(solve):
+    signature = inspect.signature(solve)
+
+    @functools.wraps(solve)
+    def cached(self, *args, **kwargs):
+        cache = self.solution_cache
+        if cache is None:
+            return solve(self, *args, **kwargs)
+        started = time.perf_counter()
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        options = {name: value for name, value in list(arguments.arguments.items())[1:] if name not in UNCACHED_OPTIONS}
+        key = cache.solution_key(self, solve.__name__, options)
+        entry = cache.get(key)
+        if entry is None:
+            solutions = solve(self, *args, **kwargs)
+            cache.put(key, solutions)
+            return solutions
+        stats = SolverStats(entry['stats']['method'])
+        vars(stats).update(entry['stats'])
+        stats.cached = True
+        solutions = [Path([self.cells[coords] for coords in path], last_seen_number)
+                     for path, last_seen_number in zip(entry['paths'], entry['last_seen_numbers'])]
+        return self.finish_solve(solutions, stats, started, arguments.arguments.get('observer'), arguments.arguments.get('stats_file'))
+
+    return cached
+
+
+class SearchGraph:
+    # index based snapshot of a maze for the faster solvers. cell i is at (i % width, i // width),
+    # neighbors[i] lists the cells you can step to from cell i (same order as legal_neighbors, without the
+    # number rules) and numbers[i] is the number in cell i or 0. if the maze has no numbers list, numbers is all 0
+    # and the number rules are switched off, same as in legal_neighbors
+    def __init__(self, maze):
+        self.width = maze.grid_size_x
+        self.height = maze.grid_size_y
+        self.size = self.width * self.height
+        self.checks_numbers = bool(maze.numbers)
+        self.final_number = maze.numbers[-1] if maze.numbers else 0
+        self.neighbors = []
+        self.numbers = []
+        for y in range(self.height):
+            for x in range(self.width):
+                cell = maze.cells[(x, y)]
+                self.neighbors.append(self.cell_neighbors(cell.walls, x, y))
+                number = cell.number
+                self.numbers.append(number if number is not None and self.checks_numbers else 0)
+        self.start = self.index(*maze.start_cell.coords())
+        self.end = self.index(*maze.end_cell.coords())
+        self.reverse_neighbors = [[] for _ in range(self.size)]
+        for cell, cell_neighbors in enumerate(self.neighbors):
+            for neighbor in cell_neighbors:
+                self.reverse_neighbors[neighbor].append(cell)
+
+
+    def cell_neighbors(self, walls, x, y):
+        cell_neighbors = []
+        if not walls['top'] and y > 0:
+            cell_neighbors.append(self.index(x, y - 1))
+        if not walls['right'] and x < self.width - 1:
+            cell_neighbors.append(self.index(x + 1, y))
+        if not walls['bottom'] and y < self.height - 1:
+            cell_neighbors.append(self.index(x, y + 1))
+        if not walls['left'] and x > 0:
+            cell_neighbors.append(self.index(x - 1, y))
+        return tuple(cell_neighbors)
+
+
+    # picks up a change to the walls of (x, y) without building the whole graph again. reverse_neighbors stay
+    # sorted, the same as a fresh SearchGraph would have them
+    def update_cell(self, maze, x, y):
+        cell = self.index(x, y)
+        old_neighbors = self.neighbors[cell]
+        new_neighbors = self.cell_neighbors(maze.cells[(x, y)].walls, x, y)
+        self.neighbors[cell] = new_neighbors
+        for neighbor in old_neighbors:
+            if neighbor not in new_neighbors:
+                self.reverse_neighbors[neighbor].remove(cell)
+        for neighbor in new_neighbors:
+            if neighbor not in old_neighbors:
+                insort(self.reverse_neighbors[neighbor], cell)
+
+
+    def index(self, x, y):
+        return y * self.width + x
+
+
+    def coords(self, index):
+        return (index % self.width, index // self.width)
+
+
+    # breadth first search backwards from the end over (cell, last_seen_number) states, ignoring whether a cell was
+    # already stepped on. returns a flat list where [last_seen_number*size + cell] is the number of steps left to
+    # the end from that state, or -1 if the end can't be reached from it
+    def distances_to_end(self):
+        size = self.size
+        numbers = self.numbers
+        end = self.end
+        reverse_neighbors = self.reverse_neighbors
+
+        distances = [-1] * (size * (self.final_number + 1))
+        distances[self.final_number*size + end] = 0
+        queue = deque([(end, self.final_number)])
+        while queue:
+            cell, last_seen_number = queue.popleft()
+            distance = distances[last_seen_number*size + cell] + 1
+            # the number we had seen before stepping into this cell
+            previous_number = numbers[cell] - 1 if numbers[cell] else last_seen_number
+            if previous_number < 0:
+                continue
+            for previous in reverse_neighbors[cell]:
+                # solutions stop at the end, so no step is ever taken out of it
+                if previous == end:
+                    continue
+                if numbers[previous] and numbers[previous] != previous_number:
+                    continue
+                state = previous_number*size + previous
+                if distances[state] < 0:
+                    distances[state] = distance
+                    queue.append((previous, previous_number))
+        return distances
+
+
+    # plain breadth first search backwards from target, never stepping on a cell in the blocked bitmask.
+    # returns a list with the number of steps from each cell to target, -1 where target can't be reached
+    def distances_to(self, target, blocked=0):
+        reverse_neighbors = self.reverse_neighbors
+        distances = [-1] * self.size
+        distances[target] = 0
+        queue = deque([target])
+        while queue:
+            cell = queue.popleft()
+            distance = distances[cell] + 1
+            for previous in reverse_neighbors[cell]:
+                if distances[previous] < 0 and not blocked >> previous & 1:
+                    distances[previous] = distance
+                    queue.append(previous)
+        return distances
+
+
+    # yields every route from source to target that doesn't step on a blocked cell or cross itself, as lists of cell
+    # indices. the depth first search always tries the neighbor closest to target first, so the first route is a
+    # shortest one and the ones after it are longer and longer detours. check_stop(expansions) is called every
+    # STOP_CHECK_INTERVAL cells stepped onto and can raise to stop the search, since finding the next route can take
+    # a long time when most of the detours are dead ends
+    def routes(self, source, target, blocked=0, check_stop=None):
+        distances = self.distances_to(target, blocked)
+        if distances[source] < 0:
+            return
+        neighbors = self.neighbors
+        closest_first = lambda cell: sorted(neighbors[cell], key=distances.__getitem__)
+        route = [source]
+        visited = blocked | 1 << source
+        untried = [iter(closest_first(source))]
+        expansions = 0
+        while untried:
+            for neighbor in untried[-1]:
+                if visited >> neighbor & 1 or distances[neighbor] < 0:
+                    continue
+                if neighbor == target:
+                    yield route + [target]
+                    continue
+                route.append(neighbor)
+                visited |= 1 << neighbor
+                untried.append(iter(closest_first(neighbor)))
+                expansions += 1
+                if check_stop is not None and not expansions % STOP_CHECK_INTERVAL:
+                    check_stop(expansions)
+                break
+            else:
+                untried.pop()
+                visited &= ~(1 << route.pop())
+
+
+    # A* over paths that never step on the same cell twice. heuristic(cell, last_seen_number) has to return a lower
+    # bound on the steps left to the end, or -1 if the end can't be reached from that state at all.
+    # returns (trail, last_seen_number), with trail None if there is no solution, and counts its work in stats.
+    # with max_iterations it also gives up (trail None) after popping that many paths, and check_stop(iterations) is
+    # called every STOP_CHECK_INTERVAL paths and can raise to stop the search
+    def astar(self, heuristic, stats, max_iterations=None, check_stop=None):
+        neighbors = self.neighbors
+        numbers = self.numbers
+        end = self.end
+        final_number = self.final_number
+        checks_numbers = self.checks_numbers
+
+        start = self.start
+        start_number = numbers[start]
+        start_estimate = heuristic(start, start_number)
+        if start_estimate < 0:
+            return None, None
+
+        # heap entries are (f, -g, tie breaker, cell, last seen number, visited bitmask, trail)
+        # so equal f values are broken in favour of the longer path
+        tie_breaker = 0
+        heap = [(start_estimate, 0, tie_breaker, start, start_number, 1 << start, (start, None))]
+        while heap:
+            if len(heap) > stats.peak_frontier:
+                stats.peak_frontier = len(heap)
+            _, negative_length, _, current, last_seen_number, visited, trail = heapq.heappop(heap)
+            stats.iterations += 1
+            if current == end:
+                return trail, last_seen_number
+            if max_iterations is not None and stats.iterations >= max_iterations:
+                return None, None
+            if check_stop is not None and not stats.iterations % STOP_CHECK_INTERVAL:
+                check_stop(stats.iterations)
+
+            stats.nodes_expanded += 1
+            length = 1 - negative_length
+            for neighbor in neighbors[current]:
+                if visited >> neighbor & 1:
+                    continue
+                number = numbers[neighbor]
+                if checks_numbers:
+                    if number and number != last_seen_number + 1:
+                        continue
+                    if neighbor == end and last_seen_number != final_number:
+                        continue
+                neighbor_number = number if number else last_seen_number
+                estimate = heuristic(neighbor, neighbor_number)
+                if estimate < 0:
+                    continue
+                tie_breaker += 1
+                heapq.heappush(heap, (length + estimate, -length, tie_breaker, neighbor, neighbor_number, visited | 1 << neighbor, (neighbor, trail)))
+
+        return None, None
+
+
+    # plain flood fill from the start, ignoring numbers. seen[cell] is 1 for every cell that can be reached
+    def reachable_from_start(self):
+        seen = bytearray(self.size)
+        self.extend_reachable(seen, self.start)
+        return seen
+
+
+    # marks cell and everything that can be reached from it in seen, stopping at cells already marked. used to grow
+    # reachable_from_start after a wall is opened without flooding the whole maze again
+    def extend_reachable(self, seen, cell):
+        neighbors = self.neighbors
+        seen[cell] = 1
+        stack = [cell]
+        while stack:
+            for neighbor in neighbors[stack.pop()]:
+                if not seen[neighbor]:
+                    seen[neighbor] = 1
+                    stack.append(neighbor)
+
+
+    # flood fill from the start that doesn't go past numbered cells. returns whether a number higher than 1 can be
+    # reached without passing through 1 first
+    def number_reachable_before_one(self):
+        numbers = self.numbers
+        neighbors = self.neighbors
+        seen = bytearray(self.size)
+        seen[self.start] = 1
+        stack = [self.start]
+        while stack:
+            cell = stack.pop()
+            if numbers[cell]:
+                if numbers[cell] > 1:
+                    return True
+                continue
+            for neighbor in neighbors[cell]:
+                if not seen[neighbor]:
+                    seen[neighbor] = 1
+                    stack.append(neighbor)
+        return False
+
+
+    # trail is a linked list of (cell index, rest of trail) going from the last cell back to the first
+    def trail_indices(self, trail):
+        indices = []
+        while trail is not None:
+            indices.append(trail[0])
+            trail = trail[1]
+        indices.reverse()
+        return indices
+
+
+    def path_from_trail(self, maze, trail, last_seen_number):
+        return self.path_from_indices(maze, self.trail_indices(trail), last_seen_number)
+
+
+    def path_from_indices(self, maze, indices, last_seen_number):
+        return Path([maze.cells[self.coords(index)] for index in indices], last_seen_number)
+
+
+class PathEnumerator:
+    # depth first enumeration of every solution of a SearchGraph, yielded as arrays of cell indices.
+    # the cells on the current path are marked in a bytearray that gets undone on the way back, and last_seen_number
+    # is put back from the number of the cell being left, so nothing is copied until a solution is found.
+    # order(cell, last_seen_number, candidates) returns the cells to try from cell in the order to try them, by
+    # default the order solve_dfs has always used. iterations counts the cells visited, same as the old solvers,
+    # and nodes_expanded / peak_frontier are kept for SolverStats. check_stop(iterations), if given, is called every
+    # STOP_CHECK_INTERVAL iterations and can raise to stop the search
+    def __init__(self, graph, order=None, check_stop=None):
+        self.graph = graph
+        self.order = order
+        self.check_stop = check_stop
+        self.iterations = 0
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+
+
+    def candidates(self, cell, visited, last_seen_number):
+        graph = self.graph
+        numbers = graph.numbers
+        candidates = []
+        for neighbor in graph.neighbors[cell]:
+            if visited[neighbor]:
+                continue
+            if graph.checks_numbers:
+                if numbers[neighbor] and numbers[neighbor] != last_seen_number + 1:
+                    continue
+                if neighbor == graph.end and last_seen_number != graph.final_number:
+                    continue
+            candidates.append(neighbor)
+        if self.order is not None:
+            return self.order(cell, last_seen_number, candidates)
+        # solve_dfs pushed the neighbors onto a stack, so it tried them last to first
+        candidates.reverse()
+        return candidates
+
+
+    def __iter__(self):
+        graph = self.graph
+        numbers = graph.numbers
+        end = graph.end
+        start = graph.start
+        check_stop = self.check_stop
+        self.iterations = 1
+        if start == end:
+            yield array('I', [start])
+            return
+
+        visited = bytearray(graph.size)
+        visited[start] = 1
+        path = [start]
+        last_seen_number = numbers[start]
+        untried = [iter(self.candidates(start, visited, last_seen_number))]
+        self.nodes_expanded = 1
+        self.peak_frontier = 1
+        while untried:
+            for cell in untried[-1]:
+                self.iterations += 1
+                if check_stop is not None and not self.iterations % STOP_CHECK_INTERVAL:
+                    check_stop(self.iterations)
+                if cell == end:
+                    path.append(cell)
+                    yield array('I', path)
+                    path.pop()
+                    continue
+                path.append(cell)
+                visited[cell] = 1
+                if numbers[cell]:
+                    last_seen_number = numbers[cell]
+                untried.append(iter(self.candidates(cell, visited, last_seen_number)))
+                self.nodes_expanded += 1
+                if len(untried) > self.peak_frontier:
+                    self.peak_frontier = len(untried)
+                break
+            else:
+                untried.pop()
+                leaving = path.pop()
+                visited[leaving] = 0
+                if numbers[leaving]:
+                    last_seen_number = numbers[leaving] - 1
+
+
+    # same search as iterating, but only counts the solutions and stops once there are limit of them. branches that
+    # couldn't reach the end even if cells could be stepped on twice (see distances_to_end) are never entered
+    def count(self, limit=None):
+        graph = self.graph
+        numbers = graph.numbers
+        size = graph.size
+        end = graph.end
+        start = graph.start
+        distances = graph.distances_to_end()
+        self.iterations = 1
+        if start == end:
+            return 1
+        if distances[numbers[start]*size + start] < 0:
+            return 0
+
+        def candidates(cell, last_seen_number):
+            return [neighbor for neighbor in self.candidates(cell, visited, last_seen_number)
+                    if distances[(numbers[neighbor] or last_seen_number)*size + neighbor] >= 0]
+
+        count = 0
+        visited = bytearray(size)
+        visited[start] = 1
+        path = [start]
+        last_seen_number = numbers[start]
+        untried = [iter(candidates(start, last_seen_number))]
+        while untried:
+            for cell in untried[-1]:
+                self.iterations += 1
+                if cell == end:
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return count
+                    continue
+                path.append(cell)
+                visited[cell] = 1
+                if numbers[cell]:
+                    last_seen_number = numbers[cell]
+                untried.append(iter(candidates(cell, last_seen_number)))
+                break
+            else:
+                untried.pop()
+                leaving = path.pop()
+                visited[leaving] = 0
+                if numbers[leaving]:
+                    last_seen_number = numbers[leaving] - 1
+        return count
+
+
+class BreadthFirstEnumerator(PathEnumerator):
+    # breadth first version of PathEnumerator, so solutions come out shortest first. every partial path is kept as
+    # (cell, last seen number, visited bitmask, trail) so making it one cell longer doesn't copy it
+    def __iter__(self):
+        graph = self.graph
+        neighbors = graph.neighbors
+        numbers = graph.numbers
+        end = graph.end
+        final_number = graph.final_number
+        checks_numbers = graph.checks_numbers
+        start = graph.start
+        check_stop = self.check_stop
+        self.iterations = 0
+
+        queue = deque([(start, numbers[start], 1 << start, (start, None))])
+        while queue:
+            if len(queue) > self.peak_frontier:
+                self.peak_frontier = len(queue)
+            cell, last_seen_number, visited, trail = queue.popleft()
+            self.iterations += 1
+            if check_stop is not None and not self.iterations % STOP_CHECK_INTERVAL:
+                check_stop(self.iterations)
+            if cell == end:
+                yield array('I', graph.trail_indices(trail))
+                continue
+            self.nodes_expanded += 1
+            for neighbor in neighbors[cell]:
+                if visited >> neighbor & 1:
+                    continue
+                number = numbers[neighbor]
+                if checks_numbers:
+                    if number and number != last_seen_number + 1:
+                        continue
+                    if neighbor == end and last_seen_number != final_number:
+                        continue
+                queue.append((neighbor, number if number else last_seen_number, visited | 1 << neighbor, (neighbor, trail)))
+
+
+# the tests a random path maze can fail, in the order fun_rejection runs them
+REJECTION_STAGES = ('fun4', 'number', 'length')
+
+
+class GenerationProgress:
+    # how a new_maze_random_path run is going. rejections counts the failed attempts by the test that failed them,
+    # and best_seed / best_stage are the attempt that got furthest through the tests so far
+    def __init__(self):
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.rejections = {stage: 0 for stage in REJECTION_STAGES}
+        self.accepted = False
+        self.best_seed = None
+        self.best_stage = None
+
+
+    def __str__(self):
+        return ', '.join(f'{key}: {value}' for key, value in self.as_dict().items())
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def as_dict(self):
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in vars(self).items()}
+
+
+class GenerationTimeout(Exception):
+    # raised when new_maze_random_path runs out of time_budget or max_attempts before a maze passed.
+    # progress is the GenerationProgress of the run. for a batch, produced is the (seed, maze) pairs that did pass
+    def __init__(self, message, progress, produced=()):
+        super().__init__(message)
+        self.progress = progress
+        self.produced = list(produced)
+
+
+class GenerationCancelled(Exception):
+    # raised when new_maze_random_path's cancel event is set
+    def __init__(self, message, progress):
+        super().__init__(message)
+        self.progress = progress
+
+
+# path_engine names for new_maze_random_path and the Maze method that makes each kind of path
+PATH_ENGINES = {'walk': 'generate_random_path', 'backbite': 'generate_backbite_path'}
+
+
 class Maze:
     grid_size_x: int
     grid_size_y: int
@@ -94,11 +988,27 @@ class Maze:
     start_cell: Cell
     end_cell: Cell
     numbers: list[int]
+    compact: bool
+    grid: bytearray
+    seed: int
+
+    # a SolutionCache the solve_* methods look in first, or None to always solve from scratch. setting it on the class
+    # turns it on for every maze in the process, setting it on one maze just for that maze
+    solution_cache = None
+
+    # where the generators get their randomness from. it's the random module unless a seeded attempt
+    # swapped in its own random.Random, and it's kept out of __init__ so the resets during generation leave it alone
+    rng = random
     
-    def __init__(self, grid_size_x=15, grid_size_y=12):
+    # compact=True stores the walls and numbers in one bytearray (see WALL_BITS) instead of a Cell object per square,
+    # and self.cells hands out CompactCell views over it
+    def __init__(self, grid_size_x=15, grid_size_y=12, compact=False):
+        self.compact = compact
         self.set_grid_size(grid_size_x, grid_size_y)
         self.reset_cells()
         self.numbers = []
+        self.seed = None
+        self.forget_solution()
         
         
     def set_grid_size(self, x, y):
@@ -109,17 +1019,25 @@ class Maze:
     def add_number(self, number):
         self.numbers.append(number)
         self.numbers.sort()
+        self.forget_solution()
         
         
     def remove_number(self, number):
         self.numbers.remove(number)
         self.numbers.sort()
+        self.forget_solution()
         
         
     def reset_cells(self):
-        self.cells = {(x, y): Cell(x, y) for x in range(self.grid_size_x) for y in range(self.grid_size_y)}
+        if self.compact:
+            self.grid = bytearray(self.grid_size_x * self.grid_size_y)
+            self.cells = CompactCells(self)
+        else:
+            self.grid = None
+            self.cells = {(x, y): Cell(x, y) for x in range(self.grid_size_x) for y in range(self.grid_size_y)}
         self.start_cell = None
         self.end_cell = None
+        self.forget_solution()
 
 
     def set_start(self, x, y):
@@ -127,6 +1045,7 @@ class Maze:
             self.start_cell.is_start = False
         self.start_cell = self.cells[(x, y)]
         self.start_cell.is_start = True
+        self.forget_solution()
 
 
     def set_end(self, x, y):
@@ -134,192 +1053,589 @@ class Maze:
             self.end_cell.is_end = False
         self.end_cell = self.cells[(x, y)]
         self.end_cell.is_end = True
+        self.forget_solution()
+
+
+    # the last solve's result, kept so toggle_wall can follow single wall edits without solving again.
+    # solution_known is whether solution (a Path, or None if there was no solution) still holds for the maze as it is,
+    # solution_graph is a SearchGraph of the maze kept up to date by toggle_wall and reachable is
+    # SearchGraph.reachable_from_start, only kept while there is no solution. anything that changes the maze other
+    # than toggle_wall has to call this, the Maze methods that do (set_start, add_number, ...) already do
+    def forget_solution(self):
+        self.solution_known = False
+        self.solution = None
+        self.solution_graph = None
+        self.reachable = None
+
+
+    def remember_solution(self, solutions):
+        self.solution_known = True
+        self.solution = solutions[0] if solutions else None
+        self.solution_graph = None
+        self.reachable = None
+
+
+    # opens the wall on side of (x, y) if it's closed and closes it if it's open, on both cells it sits between, and
+    # brings the last solution up to date. returns what happened to it:
+    # 'kept' - it still holds as it was, which is the case for any wall the solution doesn't step through
+    # 'improved' - the opened wall joins two cells of the solution, so the part between them was cut out
+    # 'repaired' - the closed wall cut the solution and a detour around it was found near the cut
+    # 'stale' - there is nothing to go on (or no way to fix it locally) and the maze has to be solved again
+    def toggle_wall(self, x, y, side) -> str:
+        step_x, step_y, other_side = WALL_SIDES[side]
+        cell = self.cells[(x, y)]
+        opening = cell.walls[side]
+        cell.walls[side] = not opening
+        other = (x + step_x, y + step_y)
+        inside = 0 <= other[0] < self.grid_size_x and 0 <= other[1] < self.grid_size_y
+        if inside:
+            self.cells[other].walls[other_side] = not opening
+        if not self.solution_known:
+            return 'stale'
+        # the outer walls can't be stepped through either way
+        if not inside:
+            return 'kept'
+
+        graph = self.solution_graph
+        if graph is None:
+            graph = self.solution_graph = SearchGraph(self)
+        else:
+            graph.update_cell(self, x, y)
+            graph.update_cell(self, *other)
+        cell, other = graph.index(x, y), graph.index(*other)
+
+        if self.solution is None:
+            return self.toggle_without_solution(graph, cell, other, opening)
+        indices = [graph.index(*path_cell.coords()) for path_cell in self.solution.path]
+        position = {index: k for k, index in enumerate(indices)}
+        if cell not in position or other not in position:
+            return 'kept'
+        first, second = sorted((position[cell], position[other]))
+        if opening:
+            return self.shortcut_solution(graph, indices, first, second)
+        if second - first != 1:
+            return 'kept'
+        return self.repair_solution(graph, indices, first)
+
+
+    # there was no solution. closing a wall can't make one, and opening one can only make one if it lets the end be
+    # reached from the start
+    def toggle_without_solution(self, graph, cell, other, opening) -> str:
+        if not opening:
+            self.reachable = None
+            return 'kept'
+        if self.reachable is None:
+            self.reachable = graph.reachable_from_start()
+        elif self.reachable[cell] or self.reachable[other]:
+            graph.extend_reachable(self.reachable, cell)
+            graph.extend_reachable(self.reachable, other)
+        if not self.reachable[graph.end]:
+            return 'kept'
+        self.forget_solution()
+        return 'stale'
 
 
+    # the opened wall is between solution cells first and second. if nothing between them is numbered, the
+    # solution can step straight from one to the other and skip what's in between
+    def shortcut_solution(self, graph, indices, first, second) -> str:
+        if second - first < 2 or indices[second] not in graph.neighbors[indices[first]] \
+                or any(graph.numbers[index] for index in indices[first + 1:second]):
+            return 'kept'
+        self.solution = graph.path_from_indices(self, indices[:first + 1] + indices[second:], self.solution.last_seen_number)
+        return 'improved'
+
+
+    # the closed wall was between solution cells cut and cut + 1. looks for the shortest detour that leaves the
+    # solution a little before the cut and comes back to it a little after, staying off the rest of the solution and
+    # every numbered cell, widening the stretch it replaces each time it fails until it reaches the numbered cells
+    # (or the start / end) on either side of the cut. if even that doesn't work the maze has to be solved again
+    def repair_solution(self, graph, indices, cut) -> str:
+        anchors = 1 << graph.start | 1 << graph.end
+        for index, number in enumerate(graph.numbers):
+            if number:
+                anchors |= 1 << index
+        lowest = cut
+        while lowest > 0 and not anchors >> indices[lowest] & 1:
+            lowest -= 1
+        highest = cut + 1
+        while highest < len(indices) - 1 and not anchors >> indices[highest] & 1:
+            highest += 1
+
+        leave, rejoin = cut, cut + 1
+        while True:
+            blocked = anchors
+            for index in indices[:leave] + indices[rejoin + 1:]:
+                blocked |= 1 << index
+            blocked &= ~(1 << indices[leave] | 1 << indices[rejoin])
+            detour = next(graph.routes(indices[leave], indices[rejoin], blocked), None)
+            if detour is not None:
+                self.solution = graph.path_from_indices(self, indices[:leave] + detour + indices[rejoin + 1:],
+                                                        self.solution.last_seen_number)
+                return 'repaired'
+            if leave == lowest and rejoin == highest:
+                self.forget_solution()
+                return 'stale'
+            widen = rejoin - leave
+            leave, rejoin = max(lowest, leave - widen), min(highest, rejoin + widen)
+
+
+    # filename is looked up in /mazes unless it's an absolute path. reads both version 1 and version 2 files
     def load_from_file(self, filename):
         with open(os.path.join('mazes', filename), 'rb') as maze_file:
-            grid_size_x_byte = maze_file.read(1)
-            grid_size_y_byte = maze_file.read(1)
-            
-            grid_size_x = int.from_bytes(grid_size_x_byte, "big")
-            grid_size_y = int.from_bytes(grid_size_y_byte, "big")
-            
-            self.__init__(grid_size_x, grid_size_y)
-            
-            self.set_grid_size(grid_size_x, grid_size_y)
-            self.reset_cells()
-            
-            start_cell_x_byte = maze_file.read(1)
-            start_cell_y_byte = maze_file.read(1)
-            
-            start_cell_x = int.from_bytes(start_cell_x_byte, "big")
-            start_cell_y = int.from_bytes(start_cell_y_byte, "big")
-            
-            
-            end_cell_x_byte = maze_file.read(1)
-            end_cell_y_byte = maze_file.read(1)
-            
-            end_cell_x = int.from_bytes(end_cell_x_byte, "big")
-            end_cell_y = int.from_bytes(end_cell_y_byte, "big")
-            
-            x = 0
-            y = 0
-            while (byte := maze_file.read(1)) and y < grid_size_y:
-                    
-                byte_str = bin(int.from_bytes(byte, 'big'))[2:].rjust(8, '0')
-                
-                firstFour = byte_str[:4]
-                
-                self.cells[(x, y)].walls['top'] = firstFour[0] == '1'
-                self.cells[(x, y)].walls['right'] = firstFour[1] == '1'
-                self.cells[(x, y)].walls['bottom'] = firstFour[2] == '1'
-                self.cells[(x, y)].walls['left'] = firstFour[3] == '1'
-                
-                lastFour = byte_str[4:]
-                cell_number = int(lastFour, base=2)
-                
-                self.cells[(x, y)].number = cell_number if cell_number != 0 else None
-                
-                x += 1
-                if x == grid_size_x:
-                    x = 0
-                if x == 0:
-                    y += 1
-                
-            self.set_start(start_cell_x, start_cell_y)
-            self.set_end(end_cell_x, end_cell_y)
+            self.load_from_bytes(maze_file)
+
+
+    # data is a maze file's contents as bytes, bytearray or memoryview, or a binary file-like object to read them from
+    def load_from_bytes(self, data):
+        if hasattr(data, 'read'):
+            data = data.read()
+        if data[:len(MAZE_MAGIC)] == MAZE_MAGIC:
+            self.decode_v2(data)
+        else:
+            self.decode_v1(data)
+
+
+    # the maze as a maze file. version is 1 or 2, or None for version 1 unless the maze doesn't fit in it (see fits_v1)
+    def to_bytes(self, version=None) -> bytes:
+        if version is None:
+            version = 1 if self.fits_v1() else FORMAT_VERSION
+        if version == FORMAT_VERSION:
+            return self.encode_v2()
+        if version != 1:
+            raise ValueError(f'unknown maze file version {version}')
+        if not self.fits_v1():
+            raise ValueError('version 1 maze files only hold grids up to 255 a side and numbers up to 15')
+        return self.encode_v1()
+
 
-            for cell in self.cells.values():
+    # writes to_bytes(version) to a binary file-like object
+    def write_to(self, file, version=None):
+        file.write(self.to_bytes(version))
+
+
+    def decode_v1(self, data):
+        grid_size_x, grid_size_y, start_cell_x, start_cell_y, end_cell_x, end_cell_y = data[:6]
+        self.__init__(grid_size_x, grid_size_y, self.compact)
+        cell_bytes = bytes(data[6:6 + grid_size_x*grid_size_y])
+        self.fill_cells(cell_bytes.translate(HIGH_NIBBLE), cell_bytes.translate(LOW_NIBBLE))
+        self.set_start(start_cell_x, start_cell_y)
+        self.set_end(end_cell_x, end_cell_y)
+
+
+    def decode_v2(self, data):
+        magic, version, flags, grid_size_x, grid_size_y, start_cell_x, start_cell_y, end_cell_x, end_cell_y = V2_HEADER.unpack_from(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f'unknown maze file version {version}')
+        num_cells = grid_size_x * grid_size_y
+        self.__init__(grid_size_x, grid_size_y, self.compact)
+
+        walls_start = V2_HEADER.size
+        numbers_start = walls_start + (num_cells + 1) // 2
+        packed_walls = bytes(data[walls_start:numbers_start])
+        walls = bytearray(2 * len(packed_walls))
+        walls[0::2] = packed_walls.translate(HIGH_NIBBLE)
+        walls[1::2] = packed_walls.translate(LOW_NIBBLE)
+        del walls[num_cells:]
+
+        if flags & NUMBERS_16_BIT:
+            numbers = array('H')
+            numbers.frombytes(data[numbers_start:numbers_start + 2*num_cells])
+            if sys.byteorder == 'little':
+                numbers.byteswap()
+        else:
+            numbers = bytes(data[numbers_start:numbers_start + num_cells])
+        if len(walls) != num_cells or len(numbers) != num_cells:
+            raise ValueError('maze file is too short')
+
+        self.fill_cells(walls, numbers)
+        self.set_start(start_cell_x, start_cell_y)
+        self.set_end(end_cell_x, end_cell_y)
+
+
+    # walls[i] is the four wall bits and numbers[i] the number (0 for none) of cell i, going along the rows.
+    # a version 1 file can stop early, so there may be fewer of them than cells
+    def fill_cells(self, walls, numbers):
+        if self.compact:
+            if max(numbers, default=0) > NUMBER_MASK:
+                raise ValueError(f'compact mazes can only hold numbers from 1 to {NUMBER_MASK}')
+            self.grid[:len(walls)] = or_bytes(bytes(walls).translate(NIBBLE_TO_HIGH), bytes(numbers))
+        else:
+            width = self.grid_size_x
+            cells = self.cells
+            for i in range(len(walls)):
+                top, right, bottom, left = WALL_PATTERNS[walls[i]]
+                cell = cells[(i % width, i // width)]
+                cell.walls = {'top': top, 'right': right, 'bottom': bottom, 'left': left}
+                cell.number = numbers[i] if numbers[i] != 0 else None
+        self.numbers = sorted(number for number in numbers if number != 0)
+
+
+    # version 1 can only hold grids up to 255 a side and numbers up to 15
+    def fits_v1(self) -> bool:
+        return self.grid_size_x <= 255 and self.grid_size_y <= 255 and max(self.numbers, default=0) <= NUMBER_MASK
+
+
+    def encode_v1(self) -> bytes:
+        header = bytes([self.grid_size_x, self.grid_size_y, self.start_cell.x, self.start_cell.y, self.end_cell.x, self.end_cell.y])
+        if self.compact:
+            return header + bytes(self.grid)
+        width = self.grid_size_x
+        cell_bytes = bytearray(width * self.grid_size_y)
+        for (x, y), cell in self.cells.items():
+            cell_walls = cell.walls
+            byte = cell.number if cell.number is not None else 0
+            for side, bit in WALL_BITS.items():
+                if cell_walls[side]:
+                    byte |= bit
+            cell_bytes[y*width + x] = byte
+        return header + bytes(cell_bytes)
+
+
+    def encode_v2(self) -> bytes:
+        width = self.grid_size_x
+        height = self.grid_size_y
+        num_cells = width * height
+        if self.compact:
+            walls = bytes(self.grid).translate(HIGH_NIBBLE)
+            numbers = list(bytes(self.grid).translate(LOW_NIBBLE))
+        else:
+            walls = bytearray(num_cells)
+            numbers = [0] * num_cells
+            for (x, y), cell in self.cells.items():
+                cell_walls = cell.walls
+                walls[y*width + x] = cell_walls['top'] << 3 | cell_walls['right'] << 2 | cell_walls['bottom'] << 1 | cell_walls['left']
                 if cell.number is not None:
-                    self.numbers.append(cell.number)
-            self.numbers.sort()
+                    numbers[y*width + x] = cell.number
+        if num_cells % 2:
+            walls = bytes(walls) + b'\x00'
+        packed_walls = or_bytes(bytes(walls[0::2]).translate(NIBBLE_TO_HIGH), bytes(walls[1::2]))
 
+        flags = 0
+        if max(numbers, default=0) > 255:
+            flags |= NUMBERS_16_BIT
+            number_plane = array('H', numbers)
+            if sys.byteorder == 'little':
+                number_plane.byteswap()
+            number_plane = number_plane.tobytes()
+        else:
+            number_plane = bytes(numbers)
 
-    def save_to_file(self, filename):
+        header = V2_HEADER.pack(MAZE_MAGIC, FORMAT_VERSION, flags, width, height,
+                                self.start_cell.x, self.start_cell.y, self.end_cell.x, self.end_cell.y)
+        return header + packed_walls + number_plane
+
+
+    # version is the same as for to_bytes
+    def save_to_file(self, filename, version=None):
+        data = self.to_bytes(version)
         with open(os.path.join('mazes', filename), 'wb') as maze_file:
-            maze_file.write(int(self.grid_size_x).to_bytes(1, 'big'))
-            maze_file.write(int(self.grid_size_y).to_bytes(1, 'big'))
-                    
-            start_cell = next((cell for cell in self.cells.values() if cell.is_start), None)
-            end_cell = next((cell for cell in self.cells.values() if cell.is_end), None)
-            
-            maze_file.write(int(start_cell.x).to_bytes(1, 'big'))
-            maze_file.write(int(start_cell.y).to_bytes(1, 'big'))
-            
-            maze_file.write(int(end_cell.x).to_bytes(1, 'big'))
-            maze_file.write(int(end_cell.y).to_bytes(1, 'big'))
-            
-            for y in range(self.grid_size_y):
-                for x in range(self.grid_size_x):
-                    cell = self.cells[(x, y)]
-                    byte = ''
-                    
-                    if cell.walls['top']:
-                        byte += '1'
-                    else:
-                        byte += '0'
-                    if cell.walls['right']:
-                        byte += '1'
-                    else:
-                        byte += '0'
-                    if cell.walls['bottom']:
-                        byte += '1'
-                    else:
-                        byte += '0'
-                    if cell.walls['left']:
-                        byte += '1'
-                    else:
-                        byte += '0'
-                    
-                    if cell.number is not None:
-                        byte += bin(cell.number)[2:].rjust(4, '0')
-                    else:
-                        byte += '0000'
-                    
-                    maze_file.write(int(byte, base=2).to_bytes(1, 'big'))
-
-
-    def solve_dfs(self, one_solution=False) -> List[Path]:
-        with open('solver_output_dfs.txt', 'w') as f:
-            traversed = Path(path=[], last_seen_number=0)
-            last_seen_number = 0
-            solutions = []
-            stack = [(None, self.start_cell)]
-            iterations = 0
-            while stack:
-                iterations += 1
-                current_cell = stack.pop()[1]
-                traversed.path.append(current_cell)
-                last_seen_number = current_cell.number if current_cell.number is not None else last_seen_number
-                # if we are at the end, we have the solution
-                if current_cell.is_end == True:
-                    if one_solution:
-                        f.write(f'iterations: {iterations}\n')
-                        return [traversed]
-                    else:
-                        solutions.append(copy.deepcopy(traversed))
-                        legal_neighbors = []
-                else:
-                    # check for legal neighbors
-                    legal_neighbors = current_cell.legal_neighbors(self, traversed.path, last_seen_number)
-                # if there are legal neighbors, add them to the stack
-                if legal_neighbors:
-                    for neighbor in legal_neighbors:
-                        stack.append((current_cell, neighbor))
-                # if there aren't any legal neighbors, we need to correct the traversed path to match the next cell on the stack
-                elif stack:
-                    while traversed.path and stack[-1][0] != traversed.path[-1]:
-                        removing_cell = traversed.path.pop()
-                        if removing_cell.number is not None:
-                            last_seen_number = removing_cell.number - 1
-                
-            f.write(f'iterations: {iterations}\n')
-            return solutions
+            maze_file.write(data)
+
+
+    # every solver returns a Solutions list whose .stats has the SolverStats of the solve. observer(stats) is called
+    # once the solve is done, and the stats are only written to disk if a stats_file is given.
+    # for running a solver on another thread: progress(stats) is called every so often while it searches with the
+    # iterations and wall_time so far, and setting cancel (a threading.Event, or anything with is_set()) makes it
+    # raise SolveCancelled the next time it checks
+    @cached_solve
+    def solve_dfs(self, one_solution=False, observer=None, stats_file=None, cancel=None, progress=None) -> List[Path]:
+        return self.solve_with_search('dfs', one_solution, observer, stats_file, cancel, progress)
+
+
+    def solve_with_search(self, method, one_solution=False, observer=None, stats_file=None, cancel=None, progress=None) -> List[Path]:
+        started = time.perf_counter()
+        graph = SearchGraph(self)
+        search = self.solution_search(graph, method, self.solve_check_stop(method, started, cancel, progress))
+        solutions = []
+        for indices in search:
+            solutions.append(graph.path_from_indices(self, indices, graph.final_number))
+            if one_solution:
+                break
+        return self.finish_solve(solutions, self.search_stats(method, search), started, observer, stats_file)
+
+
+    # the check_stop(iterations) a solver calls while it searches, or None if there's no cancel or progress to check
+    def solve_check_stop(self, method, started, cancel=None, progress=None):
+        if cancel is None and progress is None:
+            return None
+
+        def check_stop(iterations):
+            stats = SolverStats(method)
+            stats.iterations = iterations
+            stats.wall_time = time.perf_counter() - started
+            if progress is not None:
+                progress(stats)
+            if cancel is not None and cancel.is_set():
+                raise SolveCancelled(f'{method} solve was cancelled', stats)
+
+        return check_stop
+
+
+    def search_stats(self, method, search) -> SolverStats:
+        stats = SolverStats(method)
+        stats.iterations = search.iterations
+        stats.nodes_expanded = search.nodes_expanded
+        stats.peak_frontier = search.peak_frontier
+        return stats
+
+
+    # fills in the time taken and the solution count, then hands the stats to the observer and / or stats_file
+    def finish_solve(self, solutions, stats, started, observer=None, stats_file=None) -> Solutions:
+        stats.wall_time = time.perf_counter() - started
+        stats.solutions_found = len(solutions)
+        self.remember_solution(solutions)
+        if observer is not None:
+            observer(stats)
+        if stats_file is not None:
+            stats.write(stats_file)
+        return Solutions(solutions, stats)
+
+
+    # streams the solutions one at a time as they are found instead of building the whole list first, so
+    # e.g. islice(maze.iter_solutions(), 50) only does the work for the first 50.
+    # method is 'dfs', 'human' (same order as solve_dfs and solve_human_search) or 'bfs' (shortest first).
+    # observer(stats) is called when the generator is used up or closed
+    def iter_solutions(self, method='dfs', observer=None):
+        started = time.perf_counter()
+        graph = SearchGraph(self)
+        search = self.solution_search(graph, method)
+        solutions_found = 0
+        try:
+            for indices in search:
+                solutions_found += 1
+                yield graph.path_from_indices(self, indices, graph.final_number)
+        finally:
+            if observer is not None:
+                stats = self.search_stats(method, search)
+                stats.wall_time = time.perf_counter() - started
+                stats.solutions_found = solutions_found
+                observer(stats)
+
+
+    def solution_search(self, graph, method='dfs', check_stop=None) -> PathEnumerator:
+        if method == 'dfs':
+            return PathEnumerator(graph, check_stop=check_stop)
+        if method == 'human':
+            return PathEnumerator(graph, self.human_search_order(graph), check_stop)
+        if method == 'bfs':
+            return BreadthFirstEnumerator(graph, check_stop=check_stop)
+        raise ValueError("method must be 'dfs', 'human' or 'bfs'")
     
 
-    def solve_bfs(self, one_solution=False) -> List[Path]:
-        with open('solver_output_bfs.txt', 'w') as f:
-            solutions = []
-            possible_solutions = [Path([self.start_cell])]
+    @cached_solve
+    def solve_bfs(self, one_solution=False, observer=None, stats_file=None, cancel=None, progress=None) -> List[Path]:
+        started = time.perf_counter()
+        stats = SolverStats('bfs')
+        check_stop = self.solve_check_stop('bfs', started, cancel, progress)
+        solutions = []
+        possible_solutions = [Path([self.start_cell])]
+        new_solutions = []
+
+        while possible_solutions:
+            stats.peak_frontier = max(stats.peak_frontier, len(possible_solutions))
+            # for each path in the list
+            for solution in possible_solutions:
+                stats.iterations += 1
+                if check_stop is not None and not stats.iterations % STOP_CHECK_INTERVAL:
+                    check_stop(stats.iterations)
+                # get the last cell in the path
+                current = solution.path[-1]
+                # if the last cell is the end, we have the solution
+                if current.is_end:
+                    solutions.append(solution)
+                    if one_solution:
+                        return self.finish_solve(solutions, stats, started, observer, stats_file)
+                    else:
+                        break
+                stats.nodes_expanded += 1
+                # for each legal neighbor of the last cell, create a new path and create a new list of possible solutions for the next iteration
+                for neighbor in current.legal_neighbors(self, solution.path, solution.last_seen_number):
+                    new_path = Path(solution.path + [neighbor], neighbor.number if neighbor.number is not None else solution.last_seen_number)
+                    new_solutions.append(new_path)
+            # set the list of possible solutions to the list of new solutions
+            possible_solutions = new_solutions
             new_solutions = []
-            iterations = 0
-
-            while possible_solutions:
-                # for each path in the list
-                for solution in possible_solutions:
-                    iterations += 1
-                    # get the last cell in the path
-                    current = solution.path[-1]
-                    # if the last cell is the end, we have the solution
-                    if current.is_end:
-                        if one_solution:
-                            f.write(f'iterations: {iterations}\n')
-                            return [solution]
-                        else:
-                            solutions.append(solution)
-                            break
-                    # for each legal neighbor of the last cell, create a new path and create a new list of possible solutions for the next iteration
-                    for neighbor in current.legal_neighbors(self, solution.path, solution.last_seen_number):
-                        new_path = Path(solution.path + [neighbor], neighbor.number if neighbor.number is not None else solution.last_seen_number)
-                        new_solutions.append(new_path)
-                # set the list of possible solutions to the list of new solutions
-                possible_solutions = new_solutions
-                new_solutions = []
-                # repeat until we find the solution
-
-            f.write(f'iterations: {iterations}\n')
-            return solutions
-    
+            # repeat until we find the solution
+
+        return self.finish_solve(solutions, stats, started, observer, stats_file)
+
+
+    # shortest numbered route through the maze. the (cell, last_seen_number) state space is searched backwards from
+    # the end once, which takes O(cells * numbers) time and gives the exact remaining distance for every state if
+    # cells could be stepped on twice. those distances are then used as the heuristic of an A* search over real
+    # (non self-crossing) paths, so when the shortest route doesn't cross itself A* walks straight down it, and
+    # otherwise only the states around the crossing get searched
+    @cached_solve
+    def solve_shortest(self, observer=None, stats_file=None, cancel=None, progress=None) -> List[Path]:
+        started = time.perf_counter()
+        stats = SolverStats('shortest')
+        graph = SearchGraph(self)
+        distances = graph.distances_to_end()
+        size = graph.size
+        trail, last_seen_number = graph.astar(lambda cell, last_seen_number: distances[last_seen_number*size + cell], stats,
+                                              check_stop=self.solve_check_stop('shortest', started, cancel, progress))
+        solutions = [graph.path_from_trail(self, trail, last_seen_number)] if trail is not None else []
+        return self.finish_solve(solutions, stats, started, observer, stats_file)
+
+
+    # A* where the estimate for a cell is the distance to the next number we need plus the distances between all the
+    # numbers after it and the end, so it heads for each number in turn instead of wandering like dfs. that alone
+    # ignores the walls, so the estimate is the larger of it and solve_shortest's walled distance to the end, which
+    # is still never more than the real distance and is at least as close as either one
+    @cached_solve
+    def solve_astar(self, observer=None, stats_file=None, cancel=None, progress=None) -> List[Path]:
+        started = time.perf_counter()
+        stats = SolverStats('astar')
+        graph = SearchGraph(self)
+        width = graph.width
+        size = graph.size
+        distances = graph.distances_to_end()
 
-    def rate_legal_neighbors(self, legal_neighbors, last_seen_number):
+        # targets[last_seen_number] is (cell we need to get to next, distance from that cell along the rest of the chain to the end)
+        targets = {graph.final_number: (graph.end, 0)}
+        if graph.checks_numbers:
+            number_cells = self.number_cells()
+            target, chain_length = graph.end, 0
+            for number in reversed(self.numbers):
+                if number not in number_cells:
+                    break
+                number_cell = graph.index(*number_cells[number].coords())
+                chain_length += abs(number_cell % width - target % width) + abs(number_cell // width - target // width)
+                target = number_cell
+                targets[number - 1] = (target, chain_length)
+
+        def heuristic(cell, last_seen_number):
+            distance = distances[last_seen_number*size + cell]
+            if distance < 0 or last_seen_number not in targets:
+                return -1
+            target, chain_length = targets[last_seen_number]
+            return max(distance, abs(cell % width - target % width) + abs(cell // width - target // width) + chain_length)
+
+        trail, last_seen_number = graph.astar(heuristic, stats, check_stop=self.solve_check_stop('astar', started, cancel, progress))
+        solutions = [graph.path_from_trail(self, trail, last_seen_number)] if trail is not None else []
+        return self.finish_solve(solutions, stats, started, observer, stats_file)
+
+
+    # splits the maze into segments start -> 1 -> 2 -> ... -> end and solves them one at a time with a plain breadth first
+    # search, with every other numbered cell, the end and everything earlier segments went through blocked off.
+    # if a segment can't get through anymore we go back and try the previous segment's next best route, so long chains
+    # cost about as much as their segments added up instead of one search over the whole thing.
+    # in wide open mazes the segments can keep getting in each other's way, so after max_routes routes have been
+    # tried we give up on splitting it and hand the whole maze to solve_shortest
+    @cached_solve
+    def solve_segments(self, max_routes=20000, observer=None, stats_file=None, cancel=None, progress=None) -> List[Path]:
+        started = time.perf_counter()
+        stats = SolverStats('segments')
+        # every route costs a few breadth first searches, so the stop check is done after each one, and also inside
+        # the route search itself since that can go a long way between routes
+        check_stop = self.solve_check_stop('segments', started, cancel, progress)
+        route_check_stop = None if check_stop is None else lambda expansions: check_stop(stats.iterations)
+        graph = SearchGraph(self)
+        waypoints = [graph.start]
+        if graph.checks_numbers:
+            number_cells = self.number_cells()
+            for number in self.numbers:
+                if number not in number_cells:
+                    return self.finish_solve([], stats, started, observer, stats_file)
+                waypoints.append(graph.index(*number_cells[number].coords()))
+        waypoints.append(graph.end)
+        segment_count = len(waypoints) - 1
+
+        # numbered cells, the start and the end can only be stepped on as the target of their own segment
+        waypoint_cells = 1 << graph.start | 1 << graph.end
+        for cell, number in enumerate(graph.numbers):
+            if number:
+                waypoint_cells |= 1 << cell
+
+        def segment_blocked(segment, claimed):
+            return (claimed | waypoint_cells) & ~(1 << waypoints[segment]) & ~(1 << waypoints[segment + 1])
+
+        # cheap check that every segment from here on could still get through on its own
+        def segments_possible(first_segment, claimed):
+            for segment in range(first_segment, segment_count):
+                distances = graph.distances_to(waypoints[segment + 1], segment_blocked(segment, claimed))
+                if distances[waypoints[segment]] < 0:
+                    return False
+            return True
+
+        if not segments_possible(0, 0):
+            return self.finish_solve([], stats, started, observer, stats_file)
+
+        # one entry per segment we've picked a route for, plus the segment being worked on
+        claimed_before = [0]
+        routes = []
+        untried_routes = [graph.routes(waypoints[0], waypoints[1], segment_blocked(0, 0), route_check_stop)]
+        # routes through the same set of cells leave the later segments the same room, so only one of them is tried
+        tried_cells = [set()]
+        while untried_routes:
+            stats.peak_frontier = max(stats.peak_frontier, len(untried_routes))
+            segment = len(untried_routes) - 1
+            for route in untried_routes[-1]:
+                stats.iterations += 1
+                stats.nodes_expanded += len(route) - 1
+                if check_stop is not None:
+                    check_stop(stats.iterations)
+                if stats.iterations > max_routes:
+                    fallback = self.solve_shortest(cancel=cancel, progress=progress)
+                    stats.iterations += fallback.stats.iterations
+                    stats.nodes_expanded += fallback.stats.nodes_expanded
+                    stats.peak_frontier = max(stats.peak_frontier, fallback.stats.peak_frontier)
+                    return self.finish_solve(list(fallback), stats, started, observer, stats_file)
+                route_cells = 0
+                for cell in route:
+                    route_cells |= 1 << cell
+                if route_cells in tried_cells[-1]:
+                    continue
+                tried_cells[-1].add(route_cells)
+                claimed = claimed_before[-1] | route_cells
+
+                if segment + 1 == segment_count:
+                    indices = [graph.start]
+                    for segment_route in routes + [route]:
+                        indices.extend(segment_route[1:])
+                    solutions = [graph.path_from_indices(self, indices, graph.final_number)]
+                    return self.finish_solve(solutions, stats, started, observer, stats_file)
+                if not segments_possible(segment + 1, claimed):
+                    continue
+
+                routes.append(route)
+                claimed_before.append(claimed)
+                untried_routes.append(graph.routes(waypoints[segment + 1], waypoints[segment + 2], segment_blocked(segment + 1, claimed),
+                                                   route_check_stop))
+                tried_cells.append(set())
+                break
+            else:
+                untried_routes.pop()
+                tried_cells.pop()
+                claimed_before.pop()
+                if routes:
+                    routes.pop()
+
+        return self.finish_solve([], stats, started, observer, stats_file)
+
+
+    # number of solutions, without building any Path objects. with a limit it stops counting as soon as it gets there,
+    # so count_solutions(limit=2) is a cheap way to tell apart "no solution", "one solution" and "more than one"
+    def count_solutions(self, limit=None) -> int:
+        return PathEnumerator(SearchGraph(self)).count(limit)
+
+
+    # maps each number to the cell it is in
+    def number_cells(self) -> Dict[int, Cell]:
+        number_cells = {}
+        for cell in self.cells.values():
+            if cell.number is not None and cell.number not in number_cells:
+                number_cells[cell.number] = cell
+        return number_cells
+
+
+    def rate_legal_neighbors(self, legal_neighbors, last_seen_number, number_cells=None):
+        if number_cells is None:
+            number_cells = self.number_cells()
         rated_neighbors = []
         next_cell = None
         if self.numbers and last_seen_number < self.numbers[-1]:
-            next_cell_num = last_seen_number + 1
-            for cell in self.cells.values():
-                if cell.number == next_cell_num:
-                    next_cell = cell
-                    break
+            next_cell = number_cells.get(last_seen_number + 1)
         elif (self.numbers and last_seen_number == self.numbers[-1]) or not self.numbers:
             next_cell = self.end_cell
 
@@ -329,98 +1645,177 @@ class Maze:
             rated_neighbors.sort(key=lambda x: x[1], reverse=True)
             return [x[0] for x in rated_neighbors]
         else:
-            rated_neighbors = legal_neighbors
+            return legal_neighbors
             
     
-    def solve_human_search(self, one_solution=False) -> List[Path]:
-        with open('solver_output_human.txt', 'w') as f:
-            traversed = Path(path=[], last_seen_number=0)
-            solutions = []
-            last_seen_number = 0
-            stack = [(None, self.start_cell)]
-            iterations = 0
-            while stack:
-                iterations += 1
-                current_cell = stack.pop()[1]
-                traversed.path.append(current_cell)
-                last_seen_number = current_cell.number if current_cell.number is not None else last_seen_number
-                # if we are at the end, we have the solution
-                if current_cell.is_end:
-                    if one_solution:
-                        f.write(f'iterations: {iterations}\n')
-                        return [traversed]
-                    else:
-                        solutions.append(copy.deepcopy(traversed))
-                        legal_neighbors = []
-                else:
-                    # check for legal neighbors
-                    legal_neighbors = current_cell.legal_neighbors(self, traversed.path, last_seen_number)
-                    legal_neighbors = self.rate_legal_neighbors(legal_neighbors, last_seen_number)
-                # if there are legal neighbors, add them to the stack
-                if legal_neighbors:
-                    for neighbor in legal_neighbors:
-                        stack.append((current_cell, neighbor))
-                # if there aren't any legal neighbors, we need to correct the traversed path to match the next cell on the stack
-                elif stack:
-                    while traversed.path and stack[-1][0] != traversed.path[-1]:
-                        removing_cell = traversed.path.pop()
-                        if removing_cell.number is not None:
-                            last_seen_number = removing_cell.number - 1
-                
-            
-            f.write(f'iterations: {iterations}\n')
-            return solutions
+    @cached_solve
+    def solve_human_search(self, one_solution=False, observer=None, stats_file=None, cancel=None, progress=None) -> List[Path]:
+        return self.solve_with_search('human', one_solution, observer, stats_file, cancel, progress)
+
+
+    # PathEnumerator order for human search: try the neighbor closest to the next target first, see rate_legal_neighbors
+    def human_search_order(self, graph):
+        width = graph.width
+
+        # targets[last_seen_number] is the cell a person would be heading for next
+        targets = {graph.final_number: graph.end}
+        if graph.checks_numbers:
+            number_cells = self.number_cells()
+            for number in self.numbers:
+                if number in number_cells:
+                    targets[number - 1] = graph.index(*number_cells[number].coords())
+
+        def order(cell, last_seen_number, candidates):
+            if last_seen_number not in targets:
+                candidates.reverse()
+                return candidates
+            target_x, target_y = graph.coords(targets[last_seen_number])
+            candidates.sort(key=lambda neighbor: (neighbor % width - target_x)**2 + (neighbor // width - target_y)**2, reverse=True)
+            candidates.reverse()
+            return candidates
+
+        return order
    
         
-    def new_maze_random_walls(self):
-        solutions = []
-        iterations = 0
-        while len(solutions) == 0:
-            iterations += 1
-            self.set_grid_size(self.grid_size_x, self.grid_size_y)
-            self.__init__(self.grid_size_x, self.grid_size_y)
+    # every attempt gets its own random.Random seeded from seed (or from the random module if seed is None), and the
+    # attempt that worked is kept in self.seed so the same maze comes out of random_walls_attempt(self.seed).
+    # returns the number of attempts it took
+    def new_maze_random_walls(self, seed=None) -> int:
+        seeds = random.Random(seed) if seed is not None else random
+        attempts = 1
+        while not self.random_walls_attempt(seeds.getrandbits(64)):
+            attempts += 1
+        return attempts
+
+
+    # each wall between two cells is up or down with even odds. the walls are drawn as one byte each and checked
+    # for a way from the top left to the bottom right before any cell is touched, so a failed attempt only costs
+    # one flood fill over flat arrays. the cells are only written for the attempt that worked, and reused if the
+    # grid is already the right size
+    def random_walls_attempt(self, seed) -> bool:
+        self.rng = random.Random(seed)
+        width = self.grid_size_x
+        height = self.grid_size_y
+        # walls[i] is the right wall of cell (x, y) for i = y*(width-1) + x, then the bottom wall of cell (x, y)
+        # at vertical + y*width + x. odd bytes are walls
+        vertical = (width - 1) * height
+        walls = self.rng.randbytes(vertical + width * (height - 1))
+        if not self.walls_connect(walls, 0, width * height - 1):
+            return False
+
+        if len(self.cells) != width * height or (width - 1, height - 1) not in self.cells:
             self.reset_cells()
-            self.set_start(0, 0)
-            self.set_end(self.grid_size_x-1, self.grid_size_y-1)
-            cell_horizontal_pairs = []
-            cell_vertical_pairs = []
-            for x in range(self.grid_size_x):
-                for y in range(self.grid_size_y):
-                    if x < self.grid_size_x - 1:
-                        cell_horizontal_pairs.append(((x, y), (x+1, y)))
-                    if y < self.grid_size_y - 1:
-                        cell_vertical_pairs.append(((x, y), (x, y+1))
-                    )
-            for cell in cell_horizontal_pairs:
-                rand = random.randint(0, 1)
-                if rand == 1:
-                    self.cells[cell[0]].walls['right'] = True
-                    self.cells[cell[1]].walls['left'] = True
-                else:
-                    self.cells[cell[0]].walls['right'] = False
-                    self.cells[cell[1]].walls['left'] = False
-            for cell in cell_vertical_pairs:
-                rand = random.randint(0, 1)
-                if rand == 1:
-                    self.cells[cell[0]].walls['bottom'] = True
-                    self.cells[cell[1]].walls['top'] = True
-                else:
-                    self.cells[cell[0]].walls['bottom'] = False
-                    self.cells[cell[1]].walls['top'] = False
-            self.numbers = []
-            solutions = self.solve_dfs()
+        for y in range(height):
+            for x in range(width):
+                cell = self.cells[(x, y)]
+                cell.walls['top'] = y > 0 and walls[vertical + (y-1)*width + x] & 1 == 1
+                cell.walls['right'] = x < width - 1 and walls[y*(width-1) + x] & 1 == 1
+                cell.walls['bottom'] = y < height - 1 and walls[vertical + y*width + x] & 1 == 1
+                cell.walls['left'] = x > 0 and walls[y*(width-1) + x - 1] & 1 == 1
+                cell.number = None
+        self.numbers = []
+        self.set_start(0, 0)
+        self.set_end(width - 1, height - 1)
         self.remove_cutoff_sections()
-        
-        
+        self.seed = seed
+        return True
+
+
+    # depth first flood fill over the wall bytes from random_walls_attempt, stopping as soon as target is found
+    def walls_connect(self, walls, source, target) -> bool:
+        width = self.grid_size_x
+        height = self.grid_size_y
+        vertical = (width - 1) * height
+        seen = bytearray(width * height)
+        seen[source] = 1
+        stack = [source]
+        while stack:
+            i = stack.pop()
+            if i == target:
+                return True
+            y, x = divmod(i, width)
+            if x < width - 1 and not walls[y*(width-1) + x] & 1 and not seen[i + 1]:
+                seen[i + 1] = 1
+                stack.append(i + 1)
+            if y < height - 1 and not walls[vertical + i] & 1 and not seen[i + width]:
+                seen[i + width] = 1
+                stack.append(i + width)
+            if x > 0 and not walls[y*(width-1) + x - 1] & 1 and not seen[i - 1]:
+                seen[i - 1] = 1
+                stack.append(i - 1)
+            if y > 0 and not walls[vertical + i - width] & 1 and not seen[i - width]:
+                seen[i - width] = 1
+                stack.append(i - width)
+        return False
+
+
     # this method takes a completely empty maze with no walls, and walks through a random path to take the first step in creating a maze
-    # fun_score goes from 1 to 4, with 4 being the most fun and 1 being the least fun
-    def new_maze_random_path(self, fun_score=3, print_checks=False):
+    # fun_score goes from 1 to 4, with 4 being the most fun and 1 being the least fun.
+    # like new_maze_random_walls, each attempt has its own seed and the one that passed is kept in self.seed.
+    # path_engine picks how the path is made: 'walk' (generate_random_path) or 'backbite' (generate_backbite_path).
+    # time_budget (seconds) and max_attempts bound the run, and cancel is a threading.Event (or anything with
+    # is_set()) that stops it from another thread. both are checked between attempts and inside the path engines.
+    # running out of budget raises GenerationTimeout, or with return_best puts back the attempt that got furthest
+    # through the tests instead. cancelling raises GenerationCancelled. progress(GenerationProgress) is called
+    # after every attempt. returns the GenerationProgress of the run
+    def new_maze_random_path(self, fun_score=3, print_checks=False, seed=None, path_engine='walk',
+                             time_budget=None, max_attempts=None, cancel=None, progress=None, return_best=False):
         if fun_score not in [1, 2, 3, 4]:
             raise ValueError('fun_score must be 1, 2, 3, or 4')
+        if path_engine not in PATH_ENGINES:
+            raise ValueError("path_engine must be 'walk' or 'backbite'")
         
-        iterations = 0
-        num_cells = self.grid_size_x * self.grid_size_y
+        started = time.perf_counter()
+        report = GenerationProgress()
+        seeds = random.Random(seed) if seed is not None else random
+        # the maze file of the best attempt so far, so return_best can hand it back without running the attempt again
+        best_maze = None
+        
+        def check_stop():
+            report.elapsed = time.perf_counter() - started
+            if cancel is not None and cancel.is_set():
+                raise GenerationCancelled('maze generation was cancelled', report)
+            if time_budget is not None and report.elapsed > time_budget:
+                raise GenerationTimeout(f'no maze passed the fun_score {fun_score} tests in {time_budget}s', report)
+            
+        if print_checks:
+            print(f'max_length: {self.max_length_percentage(fun_score)}')
+        
+        try:
+            while True:
+                check_stop()
+                if max_attempts is not None and report.attempts >= max_attempts:
+                    raise GenerationTimeout(f'no maze passed the fun_score {fun_score} tests in {max_attempts} attempts', report)
+                attempt_seed = seeds.getrandbits(64)
+                report.attempts += 1
+                rejection = self.random_path_rejection(fun_score, attempt_seed, print_checks, path_engine, check_stop)
+                report.elapsed = time.perf_counter() - started
+                if rejection is None:
+                    report.accepted = True
+                    if progress is not None:
+                        progress(report)
+                    break
+                report.rejections[rejection] += 1
+                if report.best_stage is None or REJECTION_STAGES.index(rejection) > REJECTION_STAGES.index(report.best_stage):
+                    report.best_seed = attempt_seed
+                    report.best_stage = rejection
+                    if return_best:
+                        best_maze = self.to_bytes(FORMAT_VERSION)
+                if progress is not None:
+                    progress(report)
+        except GenerationTimeout:
+            if not return_best or report.best_seed is None:
+                raise
+            self.load_from_bytes(best_maze)
+            self.seed = report.best_seed
         
+        if print_checks:
+            print(f'attempts: {report.attempts}')
+        return report
+
+
+    # how much of the grid the random path should cover for this size and fun score
+    def max_length_percentage(self, fun_score):
         max_length_for_size = {
             5: 0.9,
             8: 0.8,
@@ -441,75 +1836,60 @@ class Maze:
             max_length_percentage = 0.65*max_length_percentage
         if fun_score == 3:
             max_length_percentage = 0.8*max_length_percentage
-            
+        return max_length_percentage
+
+
+    # one try at a random path maze, using only random.Random(seed). returns whether it passed the fun_score tests,
+    # so calling it again with the same size, fun_score and seed rebuilds the exact same maze
+    def random_path_attempt(self, fun_score, seed, print_checks=False, path_engine='walk', check_stop=None) -> bool:
+        return self.random_path_rejection(fun_score, seed, print_checks, path_engine, check_stop) is None
+
+
+    # same as random_path_attempt, but returns the name of the test the maze failed (see fun_rejection) or None
+    def random_path_rejection(self, fun_score, seed, print_checks=False, path_engine='walk', check_stop=None):
+        self.rng = random.Random(seed)
+        max_length_percentage = self.max_length_percentage(fun_score)
+
+        path, path_iterations = getattr(self, PATH_ENGINES[path_engine])(max_length_percentage, check_stop=check_stop)
+        
         if print_checks:
-            print(f'max_length: {max_length_percentage}')
+            print(f'\nsuccessfully made path in {path_iterations} {"moves" if path_engine == "backbite" else "iterations"}')
         
-        while True:
-            try:
-                path, path_iterations = self.generate_random_path(max_length_percentage)
-                iterations += path_iterations
-                
-                if print_checks:
-                    print('\nsuccessfully made path')
-                
-                self.draw_walls_around_path(path)
-                self.place_numbers_in_path(path)
-                
-                self.remove_outer_walls()
-                
-                self.randomize_walls_for_path(path)
-                self.remove_cutoff_sections()
-                
-                if fun_score > 2:
-                    if not self.number_higher_than_one_reachable_before_one():
-                        if print_checks:
-                            print('failed number test')
-                        continue
-                    else:
-                        if print_checks:
-                            print('passed number test')
-                    
-                if fun_score > 3:
-                    end_test = self.does_path_pass_end(path)
-                    consecutive_test = self.are_two_non_consecutive_nums_next_to_each_other()
-                    if not end_test and not consecutive_test:
-                        if print_checks:
-                            print('failed fun score == 4 test')
-                        continue
-                    else:
-                        if print_checks:
-                            print(f'passed fun score == 4 test with end_test: {end_test} and consecutive_test: {consecutive_test}')
-                    
-                new_solution = self.solve_bfs(one_solution=True)[0]
-                if len(new_solution.path) < num_cells*(max_length_percentage-0.1):
-                    if print_checks:
-                        print('failed length test')
-                    continue
-                else:
-                    if print_checks:
-                        print('passed length test')
-                break
-            except:
-                continue
+        self.draw_walls_around_path(path)
+        self.place_numbers_in_path(path)
+        
+        self.remove_outer_walls()
+        
+        self.randomize_walls_for_path(PathIndex(self, path))
+        self.remove_cutoff_sections()
         
+        rejection = self.fun_rejection(path, fun_score, max_length_percentage)
+        if rejection is not None:
+            if print_checks:
+                print(f'failed {rejection} test')
+            return rejection
         if print_checks:
-            print(f'iterations: {iterations}')
+            print('passed all tests')
+        self.seed = seed
+        return None
         
     
-    def generate_random_path(self, percent_traversed) -> Tuple[List[Cell], int]:
+    # check_stop() is called before every try and can raise to give up
+    def generate_random_path(self, percent_traversed, check_stop=None) -> Tuple[List[Cell], int]:
         traversed = []
         iterations = 0
         num_cells = self.grid_size_x * self.grid_size_y
         
         while True:
+            if check_stop is not None:
+                check_stop()
             iterations += 1
             # reset maze
-            self.__init__(self.grid_size_x, self.grid_size_y)
+            self.__init__(self.grid_size_x, self.grid_size_y, self.compact)
             self.reset_cells()
             self.set_start(0, 0)
-            end_x = random.randint(self.grid_size_x//4, self.grid_size_x-1)
-            end_y = random.randint(self.grid_size_y//4, self.grid_size_y-1)
+            end_x = self.rng.randint(self.grid_size_x//4, self.grid_size_x-1)
+            end_y = self.rng.randint(self.grid_size_y//4, self.grid_size_y-1)
             self.set_end(end_x, end_y)
             # start at start cell
             current_cell = self.start_cell
@@ -522,7 +1902,7 @@ class Maze:
                     legal_neighbors.remove(self.end_cell)
                 # if we have them, make a random choice and move to that cell
                 if legal_neighbors:
-                    next_cell = random.choice(legal_neighbors) 
+                    next_cell = self.rng.choice(legal_neighbors) 
                     traversed.append(next_cell)
                     current_cell = next_cell
                 else:
@@ -540,6 +1920,93 @@ class Maze:
                 return traversed, iterations
         
         
+    # every test random_path_attempt makes on a candidate maze, sharing one SearchGraph. the cheapest tests go first
+    # and it stops at the first one that fails, returning its name (one of REJECTION_STAGES), or None if the
+    # maze passed them all. the length test only does a real shortest path search when the distance map (which
+    # doesn't mind a path crossing itself, so it can only be shorter) says the solution could be too short, and
+    # that search gets 50 paths per cell before the candidate counts as too short, since it can blow up on a bad one
+    def fun_rejection(self, path, fun_score, max_length_percentage):
+        if fun_score > 3 and not self.does_path_pass_end(path) and not self.are_two_non_consecutive_nums_next_to_each_other():
+            return 'fun4'
+
+        graph = SearchGraph(self)
+        if fun_score > 2 and not graph.number_reachable_before_one():
+            return 'number'
+
+        min_length = self.grid_size_x * self.grid_size_y * (max_length_percentage - 0.1)
+        distances = graph.distances_to_end()
+        size = graph.size
+        steps = distances[graph.numbers[graph.start]*size + graph.start]
+        if steps < 0:
+            return 'length'
+        if steps + 1 < min_length:
+            trail, _ = graph.astar(lambda cell, last_seen_number: distances[last_seen_number*size + cell], SolverStats('shortest'), 50*size)
+            if trail is None or len(graph.trail_indices(trail)) < min_length:
+                return 'length'
+        return None
+
+
+    # same result as generate_random_path (a path from the start at (0, 0) to a new end cell that covers more than
+    # percent_traversed of the grid) but in bounded time. it starts from a snake through every cell and applies
+    # backbite moves to the far end: step the end to a random neighbor, which is somewhere earlier in the path,
+    # and reverse everything after that neighbor so the path stays in one piece. the start never moves, and the
+    # path is then cut at the first cell past the target length that can be an end. returns the path and the
+    # number of moves spent, which is moves (default 10 per cell) unless no cell could be the end yet.
+    # check_stop() is called before every round of moves, same as in generate_random_path
+    def generate_backbite_path(self, percent_traversed, moves=None, check_stop=None) -> Tuple[List[Cell], int]:
+        width = self.grid_size_x
+        height = self.grid_size_y
+        num_cells = width * height
+        if moves is None:
+            moves = 10 * num_cells
+        if num_cells * percent_traversed >= num_cells:
+            raise ValueError('percent_traversed must be below 1')
+        self.__init__(width, height, self.compact)
+        self.reset_cells()
+        self.set_start(0, 0)
+
+        # the snake goes along rows or along columns, whichever the coin says
+        if self.rng.randint(0, 1):
+            trail = [y * width + (x if y % 2 == 0 else width - 1 - x) for y in range(height) for x in range(width)]
+        else:
+            trail = [(y if x % 2 == 0 else height - 1 - y) * width + x for x in range(width) for y in range(height)]
+        positions = [0] * num_cells
+        for position, i in enumerate(trail):
+            positions[i] = position
+
+        # the path has to be longer than this, same as generate_random_path
+        min_length = int(num_cells * percent_traversed) + 1
+        moves_spent = 0
+        while True:
+            if check_stop is not None:
+                check_stop()
+            for _ in range(moves):
+                tail = trail[-1]
+                y, x = divmod(tail, width)
+                neighbors = []
+                if y > 0:
+                    neighbors.append(tail - width)
+                if x < width - 1:
+                    neighbors.append(tail + 1)
+                if y < height - 1:
+                    neighbors.append(tail + width)
+                if x > 0:
+                    neighbors.append(tail - 1)
+                position = positions[self.rng.choice(neighbors)]
+                if position < num_cells - 2:
+                    trail[position + 1:] = trail[:position:-1]
+                    for k in range(position + 1, num_cells):
+                        positions[trail[k]] = k
+            moves_spent += moves
+            # the end has to be at least a quarter of the way across and down, same as generate_random_path
+            for length in range(min(min_length, num_cells), num_cells + 1):
+                end_y, end_x = divmod(trail[length - 1], width)
+                if end_x >= width // 4 and end_y >= height // 4 and length > num_cells * percent_traversed:
+                    self.set_end(end_x, end_y)
+                    return [self.cells[(i % width, i // width)] for i in trail[:length]], moves_spent
+            moves = max(moves, 1)
+
+
     # this method takes a randomly generated path and places numbers throughout that path
     def place_numbers_in_path(self, path):
         step = int((self.grid_size_x + self.grid_size_y) // 2) + 5
@@ -549,7 +2016,7 @@ class Maze:
             if i == 1:
                 step_with_diff = step + 4
             else:
-                step_with_diff = step + random.randint(-3, 3)
+                step_with_diff = step + self.rng.randint(-3, 3)
             place_nums_at.append(place_nums_at[i] + step_with_diff)
         for i in range(1, up_to):
             if place_nums_at[i] < len(path):
@@ -661,52 +2128,43 @@ class Maze:
             previous_cell = current_cell
             
             
+    # path can be the list of cells or a PathIndex of it
     def randomize_walls_for_path(self, path):
-        cell_horizontal_pairs = []
-        cell_vertical_pairs = []
-        for x in range(self.grid_size_x):
-            for y in range(self.grid_size_y):
-                if x < self.grid_size_x - 1:
-                    cell_horizontal_pairs.append(((x, y), (x+1, y)))
-                if y < self.grid_size_y - 1:
-                    cell_vertical_pairs.append(((x, y), (x, y+1)))
-        for cell_pair in cell_horizontal_pairs:
-            if self.cells_consecutive_in_path(self.cells[cell_pair[0]], self.cells[cell_pair[1]], path):
-                change_wall = False
-            elif self.cells[cell_pair[0]] in path and self.cells[cell_pair[1]] in path:
-                change_wall = random.choice([True, False, False, False, False, ])
-            elif self.only_one_cell_in_path(self.cells[cell_pair[0]], self.cells[cell_pair[1]], path):
-                change_wall = random.choice([True, False, False, False, False, ])
-            else:
-                change_wall = random.choice([True, False])
-            if change_wall:
-                self.cells[cell_pair[0]].walls['right'] = not self.cells[cell_pair[0]].walls['right']
-                self.cells[cell_pair[1]].walls['left'] = not self.cells[cell_pair[1]].walls['left']
-        for cell_pair in cell_vertical_pairs:
-            if self.cells_consecutive_in_path(self.cells[cell_pair[0]], self.cells[cell_pair[1]], path):
-                change_wall = False
-            elif self.cells[cell_pair[0]] in path and self.cells[cell_pair[1]] in path:
-                change_wall = random.choice([True, False, False, False, False, ])
-            elif self.only_one_cell_in_path(self.cells[cell_pair[0]], self.cells[cell_pair[1]], path):
-                change_wall = random.choice([True, False, False, False, False, ])
-            else:
-                change_wall = random.choice([True, False])
-            if change_wall:
-                self.cells[cell_pair[0]].walls['bottom'] = not self.cells[cell_pair[0]].walls['bottom']
-                self.cells[cell_pair[1]].walls['top'] = not self.cells[cell_pair[1]].walls['top']
+        path_index = path if isinstance(path, PathIndex) else PathIndex(self, path)
+        on_path = path_index.on_path
+        positions = path_index.positions
+        width = self.grid_size_x
+        # every pair of cells side by side and then every pair on top of each other, in the same order as before so
+        # a seed still gives the same walls
+        for side, other_side, dx, dy in (('right', 'left', 1, 0), ('bottom', 'top', 0, 1)):
+            for x in range(self.grid_size_x - dx):
+                for y in range(self.grid_size_y - dy):
+                    i = y * width + x
+                    j = i + dy * width + dx
+                    if on_path[i] and on_path[j]:
+                        if abs(positions[i] - positions[j]) == 1:
+                            change_wall = False
+                        else:
+                            change_wall = self.rng.choice([True, False, False, False, False, ])
+                    elif on_path[i] or on_path[j]:
+                        change_wall = self.rng.choice([True, False, False, False, False, ])
+                    else:
+                        change_wall = self.rng.choice([True, False])
+                    if change_wall:
+                        cell1 = self.cells[(x, y)]
+                        cell2 = self.cells[(x + dx, y + dy)]
+                        cell1.walls[side] = not cell1.walls[side]
+                        cell2.walls[other_side] = not cell2.walls[other_side]
     
     
-    def cells_consecutive_in_path(self, cell1, cell2, path:list):
-        try:
-            cell1_index = path.index(cell1)
-            cell2_index = path.index(cell2)
-        except ValueError:
-            return False
-        return abs(cell1_index - cell2_index) == 1
+    def cells_consecutive_in_path(self, cell1, cell2, path):
+        path_index = path if isinstance(path, PathIndex) else PathIndex(self, path)
+        return path_index.consecutive(cell1, cell2)
     
     
-    def only_one_cell_in_path(self, cell1, cell2, path:list):
-        return cell1 in path and not cell2 in path or not cell1 in path and cell2 in path
+    def only_one_cell_in_path(self, cell1, cell2, path):
+        path_index = path if isinstance(path, PathIndex) else PathIndex(self, path)
+        return (cell1 in path_index) != (cell2 in path_index)
     
     
     def cell_is_square(self, cell:Cell):
@@ -781,55 +2239,70 @@ class Maze:
         return cutoff_cells
     
     
+    # opens walls until every cell can be reached from the start cell. the cells are grouped into connected sections
+    # once with union-find, then random walls between a reachable section and a cut-off one are opened, each one
+    # joining a whole section at a time, so the pass is near-linear instead of a flood fill after every wall
     def remove_cutoff_sections(self):
-        cutoff_cells = self.find_cells_in_cutoff_sections()
-        while cutoff_cells:
-            cell = cutoff_cells[0]
-            # find which walls this cell has
-            walls = []
-            if cell.walls['top']:
-                walls.append('top')
-            if cell.walls['right']:
-                walls.append('right')
-            if cell.walls['bottom']:
-                walls.append('bottom')
-            if cell.walls['left']:
-                walls.append('left')
-            # remove one of the walls
-            wall_to_remove = random.choice(walls)
-            cell.walls[wall_to_remove] = False
-            if wall_to_remove == 'top':
-                self.cells[(cell.x, cell.y-1)].walls['bottom'] = False
-            elif wall_to_remove == 'right':
-                self.cells[(cell.x+1, cell.y)].walls['left'] = False
-            elif wall_to_remove == 'bottom':
-                self.cells[(cell.x, cell.y+1)].walls['top'] = False
-            elif wall_to_remove == 'left':
-                self.cells[(cell.x-1, cell.y)].walls['right'] = False
-            cutoff_cells = self.find_cells_in_cutoff_sections()
+        width = self.grid_size_x
+        height = self.grid_size_y
+        parent = list(range(width * height))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # walls between two cells in the grid, as (cell index, side, neighbor index)
+        closed_walls = []
+        for y in range(height):
+            for x in range(width):
+                i = y * width + x
+                walls = self.cells[(x, y)].walls
+                if x < width - 1:
+                    if walls['right'] or self.cells[(x+1, y)].walls['left']:
+                        closed_walls.append((i, 'right', i + 1))
+                    else:
+                        parent[find(i)] = find(i + 1)
+                if y < height - 1:
+                    if walls['bottom'] or self.cells[(x, y+1)].walls['top']:
+                        closed_walls.append((i, 'bottom', i + width))
+                    else:
+                        parent[find(i)] = find(i + width)
+
+        section = [find(i) for i in range(width * height)]
+        # the walls around each section, by section
+        borders = {}
+        for wall in closed_walls:
+            if section[wall[0]] != section[wall[2]]:
+                borders.setdefault(section[wall[0]], []).append(wall)
+                borders.setdefault(section[wall[2]], []).append(wall)
+
+        start_section = section[self.start_cell.y * width + self.start_cell.x]
+        reachable = {start_section}
+        candidates = borders.pop(start_section, [])
+        while candidates:
+            # pop a random candidate wall
+            k = self.rng.randrange(len(candidates))
+            candidates[k], candidates[-1] = candidates[-1], candidates[k]
+            i, side, j = candidates.pop()
+            if section[i] in reachable and section[j] in reachable:
+                continue
+            cell = self.cells[(i % width, i // width)]
+            neighbor = self.cells[(j % width, j // width)]
+            if side == 'right':
+                cell.walls['right'] = False
+                neighbor.walls['left'] = False
+            else:
+                cell.walls['bottom'] = False
+                neighbor.walls['top'] = False
+            new_section = section[j] if section[i] in reachable else section[i]
+            reachable.add(new_section)
+            candidates.extend(borders.pop(new_section, []))
        
             
     def number_higher_than_one_reachable_before_one(self):
-        possible_paths = [Path([self.start_cell])]
-        new_paths = []
-        iterations = 0
-
-        while possible_paths:
-            for solution in possible_paths:
-                iterations += 1
-                current = solution.path[-1]
-                if current.number != None:
-                    if current.number > 1:
-                        return True
-                    else:
-                        continue
-                for neighbor in current.legal_neighbors(self, solution.path):
-                    new_path = Path(solution.path + [neighbor], neighbor.number if neighbor.number is not None else solution.last_seen_number)
-                    new_paths.append(new_path)
-            possible_paths = new_paths
-            new_paths = []
-        
-        return False
+        return SearchGraph(self).number_reachable_before_one()
     
     
     def does_path_pass_end(self, path:list[Cell], fraction=2/3):
@@ -0,0 +1,185 @@
+import json
+import os
+import signal
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from maze import Maze, SolutionCache
+from mazePack import MazePack, PACK_MAGIC
+
+MAZES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazes')
+
+# solver name -> (Maze method, whether it takes one_solution)
+SOLVE_METHODS = {
+    'dfs': ('solve_dfs', True),
+    'human': ('solve_human_search', True),
+    'bfs': ('solve_bfs', True),
+    'shortest': ('solve_shortest', False),
+    'astar': ('solve_astar', False),
+    'segments': ('solve_segments', False),
+}
+
+
+class SolveTimeout(Exception):
+    pass
+
+
+def raise_timeout(signum, frame):
+    raise SolveTimeout()
+
+
+# packs opened by this worker process, by path, so every maze after the first one from a pack is just a lookup
+open_packs = {}
+
+
+# turns on Maze.solution_cache in this worker process the first time a maze is solved with a cache directory, so
+# every worker shares the same on-disk store and a rerun over the same mazes doesn't search again
+def use_cache(cache_dir):
+    if cache_dir is not None and (Maze.solution_cache is None or Maze.solution_cache.directory != cache_dir):
+        Maze.solution_cache = SolutionCache(directory=cache_dir)
+
+
+def is_pack(path):
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(PACK_MAGIC)) == PACK_MAGIC
+
+
+# turns a mix of maze files, pack files and directories into a flat list of mazes to solve: a maze file's path, or
+# (pack path, index) for each maze in a pack. directories are expanded to the files directly inside them, and paths
+# are made absolute so load_from_file doesn't look for them under /mazes
+def maze_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                     if not name.startswith('.') and os.path.isfile(os.path.join(path, name))]
+        else:
+            names = [path]
+        for name in names:
+            name = os.path.abspath(name)
+            if is_pack(name):
+                with MazePack(name) as pack:
+                    files.extend((name, k) for k in range(len(pack)))
+            else:
+                files.append(name)
+    return files
+
+
+def load_maze(source):
+    if isinstance(source, tuple):
+        path, k = source
+        if path not in open_packs:
+            open_packs[path] = MazePack(path)
+        return open_packs[path][k]
+    maze = Maze()
+    maze.load_from_file(source)
+    return maze
+
+
+def solve_maze(maze, method='dfs', all_solutions=False):
+    name, takes_one_solution = SOLVE_METHODS[method]
+    if takes_one_solution:
+        return getattr(maze, name)(one_solution=not all_solutions)
+    return getattr(maze, name)()
+
+
+# runs in a worker process. filename is one of the entries from maze_files. the timeout is a SIGALRM in the worker
+# itself so a slow maze only costs that worker its own time, and the worker carries on with the next maze
+# afterwards. nothing is written to disk here apart from the cache_dir entries, the result only goes back to the
+# parent process
+def solve_file(filename, method='dfs', timeout=None, all_solutions=False, cache_dir=None):
+    if isinstance(filename, tuple):
+        result = {'file': filename[0], 'index': filename[1], 'method': method}
+    else:
+        result = {'file': filename, 'method': method}
+    use_alarm = timeout is not None and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        use_cache(cache_dir)
+        maze = load_maze(filename)
+        solutions = solve_maze(maze, method, all_solutions)
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        result['solved'] = len(solutions) > 0
+        if all_solutions:
+            result['paths'] = [solution.path_coords() for solution in solutions]
+        else:
+            result['path'] = solutions[0].path_coords() if solutions else None
+        result['stats'] = solutions.stats.as_dict()
+    except SolveTimeout:
+        result['timeout'] = timeout
+    except Exception as e:
+        result['error'] = repr(e)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    return result
+
+
+# solves every file on a process pool and yields one result dict per file, in the same order as filenames.
+# each result has 'file' (and 'index' for a maze from a pack) and 'method' plus either 'solved', 'path' (or 'paths'
+# with all_solutions) and 'stats', 'timeout' if the maze took longer than timeout seconds, or 'error'.
+# with a cache_dir, results are looked up in / saved to a SolutionCache there and stats['cached'] says which were reused
+def solve_batch(filenames, method='dfs', workers=None, timeout=None, all_solutions=False, chunksize=8, cache_dir=None):
+    if method not in SOLVE_METHODS:
+        raise ValueError(f"method must be one of {', '.join(SOLVE_METHODS)}")
+    if cache_dir is not None:
+        cache_dir = os.path.abspath(cache_dir)
+    solve = partial(solve_file, method=method, timeout=timeout, all_solutions=all_solutions, cache_dir=cache_dir)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(solve, filenames, chunksize=chunksize)
+
+
+# writes the results as JSON lines, flushing after every chunk so a long batch can be followed as it goes.
+# returns how many mazes were solved, timed out and failed
+def write_results(results, output, chunksize=8):
+    counts = {'solved': 0, 'unsolved': 0, 'timeout': 0, 'error': 0}
+    for written, result in enumerate(results, 1):
+        output.write(json.dumps(result) + '\n')
+        if 'timeout' in result:
+            counts['timeout'] += 1
+        elif 'error' in result:
+            counts['error'] += 1
+        else:
+            counts['solved' if result['solved'] else 'unsolved'] += 1
+        if written % chunksize == 0:
+            output.flush()
+    output.flush()
+    return counts
+
+
+parser = ArgumentParser(
+                prog='mazeBatch.py',
+                description='Solves a batch of maze files across all cores and writes the results as JSON lines')
+parser.add_argument('paths', nargs='*', default=[MAZES_DIR], help='Maze files, pack files and / or directories of them (default is /mazes)')
+parser.add_argument('-s', '--solver', choices=list(SOLVE_METHODS), default='dfs', help='Solver to use')
+parser.add_argument('-o', '--output', help='JSON lines file to write the results to (default is stdout)')
+parser.add_argument('-w', '--workers', type=int, help='Number of worker processes (default is one per core)')
+parser.add_argument('-t', '--timeout', type=float, help='Seconds before a single maze is given up on')
+parser.add_argument('-c', '--chunksize', type=int, default=8, help='Mazes handed to a worker at a time, and results written between flushes')
+parser.add_argument('--all', action='store_true', help='Write every solution instead of just the first (only for dfs, human and bfs)')
+parser.add_argument('--cache', help='Directory to keep solutions in, mazes solved before with the same solver are not searched again')
+
+
+def main():
+    args = parser.parse_args()
+    filenames = maze_files(args.paths)
+    results = solve_batch(filenames, args.solver, args.workers, args.timeout, args.all, args.chunksize, args.cache)
+    if args.output:
+        with open(args.output, 'w') as output:
+            counts = write_results(results, output, args.chunksize)
+    else:
+        counts = write_results(results, sys.stdout, args.chunksize)
+    print(f'{len(filenames)} mazes: ' + ', '.join(f'{count} {key}' for key, count in counts.items()), file=sys.stderr)
+    return 1 if counts['error'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,209 @@
+import json
+import multiprocessing
+import os
+import platform
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from maze import Maze
+from mazeBatch import load_maze
+from mazePack import MazePack
+
+MAZES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazes')
+
+SOLVERS = {
+    'dfs': lambda maze: maze.solve_dfs(one_solution=True),
+    'human': lambda maze: maze.solve_human_search(one_solution=True),
+    'bfs': lambda maze: maze.solve_bfs(one_solution=True),
+    'shortest': lambda maze: maze.solve_shortest(),
+    'astar': lambda maze: maze.solve_astar(),
+    'segments': lambda maze: maze.solve_segments(),
+}
+
+GENERATION_SIZES = [(10, 10), (15, 12), (20, 20)]
+FUN_SCORES = [1, 2, 3, 4]
+
+
+# a case is ('solve', solver name, maze name, maze file or (pack file, index)) or
+# ('generate', 'random_path' / 'random_walls', size x, size y, fun score, seed)
+def case_key(case):
+    if case[0] == 'solve':
+        return f'solve/{case[1]}/{case[2]}'
+    _, method, size_x, size_y, fun_score, seed = case
+    if method == 'random_walls':
+        return f'generate/{method}/{size_x}x{size_y}/seed{seed}'
+    return f'generate/{method}/{size_x}x{size_y}/fun{fun_score}/seed{seed}'
+
+
+# mazes is a list of (maze name, maze file or (pack file, index))
+def build_cases(solvers, mazes, generate, seed):
+    cases = []
+    for name, source in mazes:
+        for solver in solvers:
+            cases.append(('solve', solver, name, source))
+    if generate:
+        for size_x, size_y in GENERATION_SIZES:
+            cases.append(('generate', 'random_walls', size_x, size_y, None, seed))
+            for fun_score in FUN_SCORES:
+                cases.append(('generate', 'random_path', size_x, size_y, fun_score, seed))
+    return cases
+
+
+# returns (seconds taken, result fields, peak bytes allocated while solving / generating or None)
+def run_once(case, measure_memory=False):
+    if case[0] == 'solve':
+        maze = load_maze(case[3])
+        run = lambda: SOLVERS[case[1]](maze)
+    else:
+        _, method, size_x, size_y, fun_score, seed = case
+        maze = Maze(size_x, size_y)
+        run = (lambda: maze.new_maze_random_walls(seed=seed)) if method == 'random_walls' else lambda: maze.new_maze_random_path(fun_score, seed=seed)
+
+    if measure_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    solutions = run()
+    elapsed = time.perf_counter() - started
+    peak_memory = None
+    if measure_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    if case[0] == 'solve':
+        result = {'iterations': solutions.stats.iterations, 'length': len(solutions[0].path) if solutions else None}
+    elif method == 'random_walls':
+        # for the generators the iterations are the attempts it took to get a maze that passed
+        result = {'iterations': solutions, 'length': None}
+    else:
+        result = {'iterations': solutions.attempts, 'length': None}
+    return elapsed, result, peak_memory
+
+
+# runs in its own process so a case that takes too long can be killed
+def measure_case(connection, case, repeat, measure_memory):
+    try:
+        times = []
+        for _ in range(repeat):
+            elapsed, result, _ = run_once(case)
+            times.append(elapsed)
+        result['time'] = min(times)
+        result['peak_memory'] = run_once(case, measure_memory=True)[2] if measure_memory else None
+        connection.send(result)
+    except Exception as e:
+        connection.send({'error': repr(e)})
+
+
+def run_case(case, repeat, measure_memory, timeout):
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=measure_case, args=(sender, case, repeat, measure_memory))
+    process.start()
+    if receiver.poll(timeout):
+        result = receiver.recv()
+    else:
+        result = {'timeout': True}
+    process.terminate()
+    process.join()
+    return result
+
+
+def finished(result):
+    return result is not None and not result.get('timeout') and 'error' not in result
+
+
+# returns a list of messages, one for each case that got worse since the previous run
+def find_regressions(previous, current, tolerance, min_time, min_memory):
+    regressions = []
+    for key, result in current.items():
+        before = previous.get(key)
+        if not finished(before):
+            continue
+        if not finished(result):
+            regressions.append(f'{key}: finished in {before["time"]:.4f}s before, now {"timed out" if result.get("timeout") else result["error"]}')
+            continue
+        if result['time'] > before['time'] * (1 + tolerance) and result['time'] - before['time'] > min_time:
+            regressions.append(f'{key}: time {before["time"]:.4f}s -> {result["time"]:.4f}s')
+        if before['iterations'] is not None and result['iterations'] is not None and result['iterations'] > before['iterations']:
+            regressions.append(f'{key}: iterations {before["iterations"]} -> {result["iterations"]}')
+        # a generator with a fixed seed should take the same attempts every time, fewer means it makes different mazes
+        elif key.startswith('generate/') and before['iterations'] is not None and result['iterations'] is not None \
+                and result['iterations'] != before['iterations']:
+            regressions.append(f'{key}: attempts {before["iterations"]} -> {result["iterations"]}')
+        if before['length'] != result['length']:
+            regressions.append(f'{key}: solution length {before["length"]} -> {result["length"]}')
+        if before.get('peak_memory') and result.get('peak_memory') \
+                and result['peak_memory'] > before['peak_memory'] * (1 + tolerance) and result['peak_memory'] - before['peak_memory'] > min_memory:
+            regressions.append(f'{key}: peak memory {before["peak_memory"]} -> {result["peak_memory"]} bytes')
+    return regressions
+
+
+def format_result(result):
+    if result.get('timeout'):
+        return 'timed out'
+    if 'error' in result:
+        return result['error']
+    text = f'{result["time"]:.4f}s'
+    if result['iterations'] is not None:
+        text += f'  iterations: {result["iterations"]}'
+    if result['peak_memory'] is not None:
+        text += f'  peak memory: {result["peak_memory"] // 1024} KiB'
+    return text
+
+
+parser = ArgumentParser(
+                prog='mazeBenchmark.py',
+                description='Times the solvers on every maze in /mazes and the generators at a few sizes, and compares against the last run')
+parser.add_argument('-b', '--baseline', default='bench_baseline.json', help='JSON file the results are compared against and saved to')
+parser.add_argument('-s', '--solvers', nargs='+', choices=list(SOLVERS), default=list(SOLVERS), help='Solvers to time')
+parser.add_argument('-m', '--mazes', nargs='+', help='Maze files from /mazes to use (default is all of them)')
+parser.add_argument('-p', '--pack', help='Use the mazes in this pack file instead of /mazes (-m then picks them by name)')
+parser.add_argument('-r', '--repeat', type=int, default=3, help='Times to run each case, the fastest run is kept')
+parser.add_argument('-t', '--timeout', type=float, default=30, help='Seconds before a case is given up on')
+parser.add_argument('--tolerance', type=float, default=0.25, help='How much slower / bigger (0.25 = 25%%) a case can get before it is a regression')
+parser.add_argument('--min-time', type=float, default=0.005, help='Time differences below this many seconds are never regressions')
+parser.add_argument('--min-memory', type=int, default=64 * 1024, help='Memory differences below this many bytes are never regressions')
+parser.add_argument('--seed', type=int, default=0, help='Random seed for the generation cases')
+parser.add_argument('--no-generate', action='store_true', help='Skip the generation cases')
+parser.add_argument('--no-memory', action='store_true', help='Skip measuring peak memory')
+parser.add_argument('--keep-baseline', action='store_true', help='Compare against the baseline without overwriting it')
+
+
+def main():
+    args = parser.parse_args()
+    if args.pack:
+        with MazePack(args.pack) as pack:
+            mazes = [(pack.name(k) or str(k), (os.path.abspath(args.pack), k)) for k in range(len(pack))]
+        if args.mazes:
+            mazes = [maze for maze in mazes if maze[0] in args.mazes]
+    else:
+        mazes = [(name, os.path.join(MAZES_DIR, name)) for name in (args.mazes if args.mazes else sorted(os.listdir(MAZES_DIR)))]
+    cases = build_cases(args.solvers, mazes, not args.no_generate, args.seed)
+
+    previous = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            previous = json.load(f)['cases']
+
+    current = {}
+    for case in cases:
+        key = case_key(case)
+        current[key] = run_case(case, args.repeat, not args.no_memory, args.timeout)
+        print(f'{key}: {format_result(current[key])}')
+
+    regressions = find_regressions(previous, current, args.tolerance, args.min_time, args.min_memory)
+    if not args.keep_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(), 'cases': current}, f, indent=2)
+
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) against {args.baseline}:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return 1
+    if previous:
+        print(f'\nno regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
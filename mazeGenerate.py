@@ -0,0 +1,134 @@
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from maze import Maze, PATH_ENGINES, GenerationProgress, GenerationTimeout
+from mazePack import MazePackWriter
+
+MAZES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazes')
+
+
+# runs in a worker process. tries every seed in seeds and sends back (attempts made, [(seed, maze file bytes)]) for
+# the ones that passed, which is a lot less to pickle than the Maze itself. past deadline (a time.time()) it stops
+# trying, partway through an attempt if need be, and sends back what it has
+def attempt_chunk(seeds, size_x, size_y, fun_score, compact=False, path_engine='walk', deadline=None):
+    def check_stop():
+        if deadline is not None and time.time() > deadline:
+            raise GenerationTimeout('out of time', None)
+
+    attempts = 0
+    accepted = []
+    try:
+        for seed in seeds:
+            check_stop()
+            attempts += 1
+            maze = Maze(size_x, size_y, compact)
+            if maze.random_path_attempt(fun_score, seed, path_engine=path_engine, check_stop=check_stop):
+                accepted.append((seed, maze.to_bytes()))
+    except GenerationTimeout:
+        pass
+    return attempts, accepted
+
+
+# yields count (seed, maze) pairs generated with new_maze_random_path's attempts spread over a process pool.
+# the attempt seeds come from random.Random(seed) and the chunks are read back in the order they were handed out,
+# so the same seed gives the same mazes whatever the number of workers, and each maze can be rebuilt on its own
+# with Maze(size_x, size_y).random_path_attempt(fun_score, maze.seed, path_engine=path_engine).
+# time_budget (seconds over the whole batch) and max_attempts bound the run the same way they do for
+# new_maze_random_path. running out of either before count mazes passed raises GenerationTimeout, with the
+# mazes already yielded in its produced and the attempts that came back in its progress
+def generate_batch(count, size_x, size_y, fun_score=3, seed=None, workers=None, chunksize=4, compact=False, path_engine='walk',
+                   time_budget=None, max_attempts=None):
+    if fun_score not in [1, 2, 3, 4]:
+        raise ValueError('fun_score must be 1, 2, 3, or 4')
+    seeds = random.Random(seed)
+    workers = workers or os.cpu_count()
+    report = GenerationProgress()
+    started = time.perf_counter()
+    # a wall clock deadline, since the workers can't see this process's perf_counter
+    deadline = None if time_budget is None else time.time() + time_budget
+    submitted = 0
+    produced = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            while len(produced) < count:
+                # keep every worker busy with a chunk queued up behind the one it's on, until the budget is used up
+                while len(pending) < workers * 2 and (max_attempts is None or submitted < max_attempts) \
+                        and (deadline is None or time.time() < deadline):
+                    size = chunksize if max_attempts is None else min(chunksize, max_attempts - submitted)
+                    chunk = [seeds.getrandbits(64) for _ in range(size)]
+                    pending.append(executor.submit(attempt_chunk, chunk, size_x, size_y, fun_score, compact, path_engine, deadline))
+                    submitted += size
+                if not pending:
+                    report.elapsed = time.perf_counter() - started
+                    limit = f'{time_budget}s' if max_attempts is None or submitted < max_attempts else f'{max_attempts} attempts'
+                    raise GenerationTimeout(f'only {len(produced)} of {count} mazes passed the fun_score {fun_score} tests in {limit}',
+                                            report, produced)
+                attempts, accepted = pending.popleft().result()
+                report.attempts += attempts
+                for accepted_seed, data in accepted:
+                    if len(produced) < count:
+                        maze = Maze(compact=compact)
+                        maze.load_from_bytes(data)
+                        maze.seed = accepted_seed
+                        produced.append((accepted_seed, maze))
+                        yield accepted_seed, maze
+            report.accepted = True
+            report.elapsed = time.perf_counter() - started
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def maze_filename(maze, fun_score):
+    return f'fun_{fun_score}_{maze.grid_size_x}x{maze.grid_size_y}_{maze.seed:016x}'
+
+
+parser = ArgumentParser(
+                prog='mazeGenerate.py',
+                description='Generates random path mazes across all cores and saves each one under a name that includes its seed')
+parser.add_argument('-n', '--count', type=int, default=10, help='Number of mazes to generate')
+parser.add_argument('-x', '--size-x', type=int, default=15, help='Width of the mazes')
+parser.add_argument('-y', '--size-y', type=int, default=12, help='Height of the mazes')
+parser.add_argument('-f', '--fun-score', type=int, choices=[1, 2, 3, 4], default=3, help='Fun score of the mazes')
+parser.add_argument('-s', '--seed', type=int, help='Seed for the whole run, the same seed gives the same mazes')
+parser.add_argument('-o', '--output', default=MAZES_DIR, help='Directory to save the mazes to (default is /mazes)')
+parser.add_argument('--pack', help='Append the mazes to this pack file instead of saving them one file each')
+parser.add_argument('-w', '--workers', type=int, help='Number of worker processes (default is one per core)')
+parser.add_argument('-p', '--path-engine', choices=list(PATH_ENGINES), default='walk', help='How the random path is made, backbite takes about the same time every attempt')
+parser.add_argument('-c', '--chunksize', type=int, default=4, help='Attempts handed to a worker at a time')
+parser.add_argument('-t', '--time-budget', type=float, help='Seconds to give the whole run before stopping with the mazes made so far')
+parser.add_argument('-a', '--max-attempts', type=int, help='Attempts to make over the whole run before stopping with the mazes made so far')
+
+
+def main():
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    if args.pack:
+        pack = MazePackWriter(args.pack)
+    else:
+        os.makedirs(output, exist_ok=True)
+    try:
+        for _, maze in generate_batch(args.count, args.size_x, args.size_y, args.fun_score, args.seed, args.workers, args.chunksize,
+                                      path_engine=args.path_engine, time_budget=args.time_budget, max_attempts=args.max_attempts):
+            filename = maze_filename(maze, args.fun_score)
+            if args.pack:
+                print(f'{pack.append(maze, filename)}: {filename}')
+            else:
+                maze.save_to_file(os.path.join(output, filename))
+                print(filename)
+    except GenerationTimeout as e:
+        print(f'{e} ({e.progress.attempts} attempts)', file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.pack:
+            pack.close()
+
+
+if __name__ == "__main__":
+    main()
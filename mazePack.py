@@ -0,0 +1,189 @@
+import mmap
+import os
+import struct
+from argparse import ArgumentParser
+
+from maze import Maze, MAZE_MAGIC
+
+# a pack is PACK_MAGIC, then one record per maze, then the index and the footer. a record is RECORD_HEADER (maze
+# length, name length), the name in utf-8 and the maze as a version 2 maze file. the index is the offset of every
+# record as an 8 byte number, and the footer is the index offset, the maze count and FOOTER_MAGIC. all big-endian
+PACK_MAGIC = b'NMZPACK\x01'
+FOOTER_MAGIC = b'NMZINDEX'
+RECORD_HEADER = struct.Struct('>IH')
+INDEX_ENTRY = struct.Struct('>Q')
+FOOTER = struct.Struct('>QQ8s')
+
+
+# walks the records from the start of the pack and returns (offsets, where the records end). used when the index
+# is missing because a writer never got to close the pack
+def scan_records(data):
+    offsets = []
+    offset = len(PACK_MAGIC)
+    while offset + RECORD_HEADER.size <= len(data):
+        maze_length, name_length = RECORD_HEADER.unpack_from(data, offset)
+        maze_start = offset + RECORD_HEADER.size + name_length
+        end = maze_start + maze_length
+        if maze_length == 0 or end > len(data) or data[maze_start:maze_start + len(MAZE_MAGIC)] != MAZE_MAGIC:
+            break
+        offsets.append(offset)
+        offset = end
+    return offsets, offset
+
+
+# read only view of a pack. the file is mmapped and only the index entry and the record of the maze asked for are
+# touched, so pack[k] costs the same whether the pack holds ten mazes or a million
+class MazePack:
+    def __init__(self, path, compact=False):
+        self.path = path
+        self.compact = compact
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(PACK_MAGIC)] != PACK_MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a maze pack')
+        self.offsets = None
+        index_offset, count, magic = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size) \
+            if len(self.data) >= len(PACK_MAGIC) + FOOTER.size else (0, 0, b'')
+        if magic == FOOTER_MAGIC:
+            self.index_offset = index_offset
+            self.count = count
+        else:
+            self.offsets, self.index_offset = scan_records(self.data)
+            self.count = len(self.offsets)
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+    def record(self, k):
+        if not 0 <= k < self.count:
+            raise IndexError(f'pack has {self.count} mazes')
+        if self.offsets is not None:
+            return self.offsets[k]
+        return INDEX_ENTRY.unpack_from(self.data, self.index_offset + k * INDEX_ENTRY.size)[0]
+
+
+    def name(self, k):
+        offset = self.record(k)
+        _, name_length = RECORD_HEADER.unpack_from(self.data, offset)
+        start = offset + RECORD_HEADER.size
+        return self.data[start:start + name_length].decode('utf-8')
+
+
+    # the version 2 bytes of maze k, without copying them out of the mmap. release() it before closing the pack
+    def raw(self, k):
+        offset = self.record(k)
+        maze_length, name_length = RECORD_HEADER.unpack_from(self.data, offset)
+        start = offset + RECORD_HEADER.size + name_length
+        return memoryview(self.data)[start:start + maze_length]
+
+
+    def __getitem__(self, k):
+        maze = Maze(compact=self.compact)
+        data = self.raw(k)
+        try:
+            maze.load_from_bytes(data)
+        finally:
+            data.release()
+        return maze
+
+
+    def __iter__(self):
+        for k in range(self.count):
+            yield self[k]
+
+
+# appends mazes to a pack, creating it if needed. the records are written as they come and the index is only
+# written on close. opening an existing pack drops its index, appends after its last record and writes the whole
+# index again on close. if a writer dies before closing, MazePack finds the records by walking them instead
+class MazePackWriter:
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with MazePack(path) as pack:
+                self.offsets = [pack.record(k) for k in range(len(pack))]
+                end = pack.index_offset
+            self.file = open(path, 'r+b')
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.offsets = []
+            self.file = open(path, 'wb')
+            self.file.write(PACK_MAGIC)
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    # returns the index of the maze in the pack
+    def append(self, maze, name=''):
+        data = maze.to_bytes(2)
+        encoded_name = name.encode('utf-8')
+        self.offsets.append(self.file.tell())
+        self.file.write(RECORD_HEADER.pack(len(data), len(encoded_name)) + encoded_name + data)
+        return len(self.offsets) - 1
+
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(b''.join(INDEX_ENTRY.pack(offset) for offset in self.offsets))
+        self.file.write(FOOTER.pack(index_offset, len(self.offsets), FOOTER_MAGIC))
+        self.file.close()
+
+
+parser = ArgumentParser(
+                prog='mazePack.py',
+                description='Packs maze files into one memory mapped pack file, or lists what is in a pack')
+parser.add_argument('pack', help='Pack file to write to or list')
+parser.add_argument('mazes', nargs='*', help='Maze files and / or directories of maze files to append to the pack')
+
+
+def main():
+    args = parser.parse_args()
+    if not args.mazes:
+        with MazePack(args.pack) as pack:
+            for k in range(len(pack)):
+                print(f'{k}: {pack.name(k)}')
+        return
+    with MazePackWriter(args.pack) as writer:
+        for path in args.mazes:
+            if os.path.isdir(path):
+                files = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if not name.startswith('.') and os.path.isfile(os.path.join(path, name))]
+            else:
+                files = [path]
+            for filename in files:
+                maze = Maze()
+                maze.load_from_file(os.path.abspath(filename))
+                writer.append(maze, os.path.basename(filename))
+        print(f'{args.pack} holds {len(writer)} mazes')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import io
+
+import pytest
+
+from maze import Maze, SolutionCache, MAZE_MAGIC, NUMBERS_16_BIT, V2_HEADER
+from mazePack import MazePack, MazePackWriter
+
+
+# 3x3 with no walls inside, start in the top left and end in the top right
+def open_maze():
+    maze = Maze(3, 3)
+    maze.set_start(0, 0)
+    maze.set_end(2, 0)
+    return maze
+
+
+# open_maze with a wall between the two top left cells and number in the middle cell
+def numbered_maze(number):
+    maze = open_maze()
+    maze.toggle_wall(0, 0, 'right')
+    maze.cells[(1, 1)].number = number
+    maze.add_number(number)
+    return maze
+
+
+def reloaded(data):
+    maze = Maze()
+    maze.load_from_bytes(data)
+    return maze
+
+
+def test_toggle_wall_before_solving_is_stale():
+    maze = open_maze()
+    assert maze.toggle_wall(1, 1, 'right') == 'stale'
+
+
+def test_toggle_wall_away_from_solution_is_kept():
+    maze = open_maze()
+    maze.solve_shortest()
+    assert maze.toggle_wall(0, 2, 'right') == 'kept'
+    assert maze.solution.path_coords() == [(0, 0), (1, 0), (2, 0)]
+
+
+def test_toggle_wall_through_solution_is_repaired_then_improved():
+    maze = open_maze()
+    maze.solve_shortest()
+    assert maze.toggle_wall(0, 0, 'right') == 'repaired'
+    assert maze.solution.path_coords() == [(0, 0), (0, 1), (1, 1), (1, 0), (2, 0)]
+    assert maze.toggle_wall(0, 0, 'right') == 'improved'
+    assert maze.solution.path_coords() == [(0, 0), (1, 0), (2, 0)]
+
+
+def test_toggle_wall_that_cuts_off_the_end_is_stale():
+    maze = open_maze()
+    maze.solve_shortest()
+    maze.toggle_wall(2, 0, 'bottom')
+    assert maze.toggle_wall(2, 0, 'left') == 'stale'
+    assert not maze.solve_shortest()
+    # closing a wall can never give a maze with no solution one
+    assert maze.toggle_wall(0, 1, 'right') == 'kept'
+    assert maze.toggle_wall(2, 0, 'bottom') == 'stale'
+
+
+def test_cached_solve_misses_after_an_edit(tmp_path):
+    maze = open_maze()
+    maze.solution_cache = SolutionCache(directory=str(tmp_path))
+    maze.solve_shortest()
+    assert maze.solve_shortest().stats.cached
+    maze.toggle_wall(0, 0, 'right')
+    solutions = maze.solve_shortest()
+    assert not solutions.stats.cached
+    assert solutions[0].path_coords() == [(0, 0), (0, 1), (1, 1), (1, 0), (2, 0)]
+    assert (maze.solution_cache.hits, maze.solution_cache.misses) == (1, 2)
+    # saving the same key again replaces its file, the size on disk only counts it once
+    key = next(iter(maze.solution_cache.entries))
+    maze.solution_cache.write_disk(key, maze.solution_cache.entries[key])
+    assert maze.solution_cache.disk_bytes == sum(path.stat().st_size for path in tmp_path.iterdir())
+
+
+def test_to_bytes_picks_v1_when_the_maze_fits():
+    maze = numbered_maze(15)
+    data = maze.to_bytes()
+    assert data[:len(MAZE_MAGIC)] != MAZE_MAGIC
+    assert len(data) == 6 + 3 * 3
+    assert reloaded(data).to_bytes(2) == maze.to_bytes(2)
+
+
+def test_to_bytes_v1_raises_when_the_maze_does_not_fit():
+    with pytest.raises(ValueError):
+        numbered_maze(16).to_bytes(1)
+
+
+def test_v2_round_trip():
+    maze = numbered_maze(200)
+    data = maze.to_bytes()
+    assert data[:len(MAZE_MAGIC)] == MAZE_MAGIC
+    assert not V2_HEADER.unpack_from(data)[2] & NUMBERS_16_BIT
+    copy = reloaded(data)
+    assert copy.to_bytes() == data
+    assert copy.numbers == [200]
+    assert copy.cells[(1, 1)].number == 200
+    assert copy.cells[(0, 0)].walls['right'] and copy.cells[(1, 0)].walls['left']
+    assert (copy.start_cell.coords(), copy.end_cell.coords()) == ((0, 0), (2, 0))
+
+
+def test_v2_round_trip_with_16_bit_numbers():
+    maze = numbered_maze(300)
+    data = maze.to_bytes()
+    assert V2_HEADER.unpack_from(data)[2] & NUMBERS_16_BIT
+    copy = reloaded(data)
+    assert copy.to_bytes() == data
+    assert copy.numbers == [300]
+    assert copy.cells[(1, 1)].number == 300
+
+
+def test_pack_writer_appends_to_an_existing_pack(tmp_path):
+    path = str(tmp_path / 'test.mzpack')
+    with MazePackWriter(path) as writer:
+        assert writer.append(numbered_maze(1), 'one') == 0
+        assert writer.append(numbered_maze(300), 'three hundred') == 1
+    with MazePackWriter(path) as writer:
+        assert writer.append(open_maze(), 'open') == 2
+    with MazePack(path) as pack:
+        assert len(pack) == 3
+        assert [pack.name(k) for k in range(3)] == ['one', 'three hundred', 'open']
+        assert [maze.to_bytes(2) for maze in pack] == [numbered_maze(1).to_bytes(2), numbered_maze(300).to_bytes(2), open_maze().to_bytes(2)]
+
+
+def test_pack_left_unclosed_is_read_from_its_records(tmp_path):
+    path = str(tmp_path / 'test.mzpack')
+    writer = MazePackWriter(path)
+    writer.append(numbered_maze(1), 'one')
+    writer.append(numbered_maze(2), 'two')
+    # the writer dies before it gets to write the index
+    writer.file.close()
+    with MazePack(path) as pack:
+        assert len(pack) == 2
+        assert pack.name(1) == 'two'
+        assert pack[1].numbers == [2]
+    with MazePackWriter(path) as writer:
+        writer.append(numbered_maze(3), 'three')
+    with MazePack(path) as pack:
+        assert pack.offsets is None
+        assert [maze.numbers for maze in pack] == [[1], [2], [3]]
+
+
+def test_load_from_bytes_takes_bytes_memoryviews_and_files():
+    maze = numbered_maze(300)
+    file = io.BytesIO()
+    maze.write_to(file)
+    data = maze.to_bytes()
+    assert file.getvalue() == data
+    file.seek(0)
+    for source in [data, bytearray(data), memoryview(data), file]:
+        assert reloaded(source).to_bytes() == data